@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Note content compression benchmark.
+
+Loads the same corpus, typical notes plus long pasted ones, into one
+store that compresses large content and one that does not, then compares
+database size, WAL bytes written per autosave of a long note, and the
+latency of opening (get_note) and autosaving (update_note) it. Runs
+headless: NoteStore only needs GLib.
+
+    python3 benchmarks/bench_compression.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_note_store import _db_bytes, git_revision, populate, summarize  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.constants import CONTENT_COMPRESS_MIN_BYTES  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+from betternotes.rich_text import (  # noqa: E402
+    Document,
+    parse_document,
+    serialize_document,
+)
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+MODES = {
+    'plain': None,
+    'compressed': CONTENT_COMPRESS_MIN_BYTES,
+}
+
+
+def build_corpus(seed, typical, sizes):
+    """Return (typical notes, {size: long note content}) in format v2,
+    as the editor saves them."""
+    corpus = Corpus(seed)
+    notes = [
+        (title, serialize_document(parse_document(content)), color, tags)
+        for title, content, color, tags in corpus.notes(typical)
+    ]
+    long_notes = {
+        size: serialize_document(Document.from_plain_text(corpus.pasted_text(size)))
+        for size in sizes
+    }
+    return notes, long_notes
+
+
+def wal_bytes(path):
+    wal = path + '-wal'
+    return os.path.getsize(wal) if os.path.exists(wal) else 0
+
+
+def checkpoint(path):
+    """Copy the WAL into the database and truncate it to zero bytes."""
+    db = sqlite3.connect(path)
+    try:
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        db.close()
+
+
+def bench_mode(mode, notes, long_notes, repeat, workdir):
+    path = os.path.join(workdir, f'compression-{mode}.db')
+    store = NoteStore(path, compress_min_bytes=MODES[mode])
+    populate(store, notes)
+    long_ids = {
+        size: store.create_note(title=f'pasted {size}', content=content).id
+        for size, content in long_notes.items()
+    }
+    store.close()
+    checkpoint(path)
+    results = [{'op': 'db_size', 'bytes': _db_bytes(path)}]
+
+    store = NoteStore(path, compress_min_bytes=MODES[mode])
+    for size, note_id in long_ids.items():
+        content = long_notes[size]
+        note_bytes = len(content.encode())
+        autosaves = []
+        written = []
+        for _ in range(repeat):
+            # Each autosave adds a word mid-note, as typing does
+            middle = content.index('\\n', len(content) // 2)
+            content = content[:middle] + ' typed' + content[middle:]
+            checkpoint(path)
+            start = time.perf_counter()
+            store.update_note(note_id, content=content)
+            autosaves.append(time.perf_counter() - start)
+            written.append(wal_bytes(path))
+
+        opens = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            store.get_note(note_id)
+            opens.append(time.perf_counter() - start)
+
+        results.append(summarize('autosave', autosaves, note_bytes=note_bytes))
+        results.append({'op': 'wal_bytes_per_autosave',
+                        'bytes': sum(written) // len(written),
+                        'note_bytes': note_bytes})
+        results.append(summarize('open', opens, note_bytes=note_bytes))
+    store.close()
+
+    for r in results:
+        r['mode'] = mode
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='characters per long pasted note')
+    parser.add_argument('--typical', type=int, default=1000,
+                        help='number of typical notes alongside them')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    notes, long_notes = build_corpus(args.seed, args.typical, args.sizes)
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': args.seed,
+        'compress_min_bytes': CONTENT_COMPRESS_MIN_BYTES,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in MODES:
+            print(f'mode={mode}', file=sys.stderr)
+            report['results'] += bench_mode(mode, notes, long_notes, args.repeat, workdir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Headless rich-text document model benchmark.
+
+Times parsing (into a Document, and into the spans a text buffer loads),
+serializing, plain-text extraction and previews for the legacy format and
+format v2, and reports how much space each takes as content and as a
+notes database. Runs on heavily formatted notes of about 100 KB and on
+typical notes, synthetic by default or taken from an existing notes
+database with --db. Needs no display; tests/test_rich_text.py checks
+that both formats read back the same documents.
+
+    python3 benchmarks/bench_document.py --notes 5 --output doc.json
+    python3 benchmarks/bench_document.py --db ~/.local/share/betternotes/notes.db
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from urllib.request import pathname2url
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_note_store import _db_bytes, git_revision, populate, summarize  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+from betternotes.rich_text import (  # noqa: E402
+    document_preview,
+    get_plain_text,
+    parse_document,
+    parse_spans,
+    serialize_document,
+)
+
+
+def legacy_serialize_document(document):
+    """Reference: the legacy format, as written before format v2."""
+    return json.dumps({'blocks': [
+        {'type': block.type,
+         'runs': [{'text': run.text, 'tags': run.tags} for run in block.runs]}
+        for block in document.blocks
+    ]})
+
+
+def time_ops(documents, repeat, suffix):
+    """Time each operation on the same documents in both formats."""
+    parsed = [parse_document(d) for d in documents]
+    formats = {
+        'legacy': [legacy_serialize_document(d) for d in parsed],
+        'v2': [serialize_document(d) for d in parsed],
+    }
+    serializers = {'legacy': legacy_serialize_document, 'v2': serialize_document}
+
+    samples = {}
+    for name, contents in formats.items():
+        for op in ('parse', 'parse_spans', 'serialize', 'plain_text'):
+            samples[f'{op}_{name}_{suffix}'] = []
+        for _ in range(repeat):
+            for content in contents:
+                start = time.perf_counter()
+                document = parse_document(content)
+                samples[f'parse_{name}_{suffix}'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                parse_spans(content)
+                samples[f'parse_spans_{name}_{suffix}'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                serializers[name](document)
+                samples[f'serialize_{name}_{suffix}'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                get_plain_text(content)
+                samples[f'plain_text_{name}_{suffix}'].append(time.perf_counter() - start)
+
+    samples[f'preview_{suffix}'] = []
+    for _ in range(repeat):
+        for document in parsed:
+            start = time.perf_counter()
+            document_preview(document)
+            samples[f'preview_{suffix}'].append(time.perf_counter() - start)
+
+    results = [summarize(op, s) for op, s in samples.items()]
+    for name, contents in formats.items():
+        results.append({
+            'op': f'content_size_{name}_{suffix}',
+            'bytes': sum(len(c.encode()) for c in contents),
+            'notes': len(contents),
+        })
+    return results, formats
+
+
+def db_sizes(formats, workdir):
+    """Store the same notes once per format and report the database sizes."""
+    results = []
+    for name, contents in formats.items():
+        path = os.path.join(workdir, f'doc-{name}.db')
+        store = NoteStore(path)
+        populate(store, [('', content, 'yellow', []) for content in contents])
+        store.close()
+        results.append({'op': f'db_size_{name}', 'bytes': _db_bytes(path),
+                        'notes': len(contents)})
+    return results
+
+
+def read_contents(db_path):
+    """Return the content of every note in an existing notes database."""
+    uri = f'file:{pathname2url(os.path.abspath(db_path))}?mode=ro'
+    db = sqlite3.connect(uri, uri=True)
+    try:
+        return [row[0] for row in db.execute('SELECT content FROM notes') if row[0]]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notes', type=int, default=5)
+    parser.add_argument('--size', type=int, default=100_000,
+                        help='approximate characters per large note')
+    parser.add_argument('--typical', type=int, default=1000,
+                        help='number of typical notes')
+    parser.add_argument('--db', help='take typical notes from this notes database '
+                                     '(opened read-only) instead of the synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.seed)
+    large = [corpus.formatted_rich_text(args.size) for _ in range(args.notes)]
+    if args.db:
+        typical = read_contents(args.db)
+    else:
+        typical = [corpus.rich_text() for _ in range(args.typical)]
+
+    results, _ = time_ops(large, args.repeat, 'large')
+    typical_results, typical_formats = time_ops(typical, 1, 'typical')
+    results += typical_results
+    with tempfile.TemporaryDirectory() as workdir:
+        results += db_sizes(typical_formats, workdir)
+
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'corpus': args.db or 'synthetic',
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
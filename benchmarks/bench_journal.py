@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Edit journal write amplification benchmark.
+
+Replays the same synthetic typing session, bursts of keystrokes split by
+pauses, on notes of several sizes under two policies: saving the note to
+the database 500ms after each pause and at least every 5s (as before the
+edit journal), and journaling edits every JOURNAL_DELAY_MS while saving
+only after AUTOSAVE_DELAY_MS of quiet or every AUTOSAVE_MAX_WAIT_MS.
+Reports database saves, WAL and journal bytes written, and the latency of
+a save and of a journal record. Time is simulated, so a session of
+minutes runs in seconds. Runs headless: NoteStore only needs GLib.
+
+    python3 benchmarks/bench_journal.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_compression import checkpoint, wal_bytes  # noqa: E402
+from bench_note_store import git_revision, summarize  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.constants import (  # noqa: E402
+    AUTOSAVE_DELAY_MS,
+    AUTOSAVE_MAX_WAIT_MS,
+    JOURNAL_DELAY_MS,
+)
+from betternotes.edit_journal import EditJournal  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+from betternotes.rich_text import Block, Document, Run, serialize_document  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10_000, 100_000)
+
+# (journal delay, save delay, save max wait) in ms; None: no journal
+POLICIES = {
+    'autosave_only': (None, 500, 5000),
+    'journal': (JOURNAL_DELAY_MS, AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_WAIT_MS),
+}
+
+
+def typing_session(rnd, keys):
+    """Return keystroke times in ms: bursts of typing split by pauses."""
+    times = []
+    now = 0
+    while len(times) < keys:
+        for _ in range(rnd.randint(5, 80)):
+            now += rnd.randint(80, 250)
+            times.append(now)
+        now += rnd.choice((400, 800, 1500, 3000, 10_000))
+    return times[:keys]
+
+
+def fire_times(key_times, delay_ms, max_wait_ms):
+    """When a timer armed by the first key of a burst fires: delay_ms
+    after the burst's last key, but at most max_wait_ms after its first."""
+    fired = []
+    first = last = None
+    for t in key_times:
+        if first is not None:
+            due = min(last + delay_ms, first + max_wait_ms)
+            if t >= due:
+                fired.append(due)
+                first = None
+        if first is None:
+            first = t
+        last = t
+    if first is not None:
+        fired.append(min(last + delay_ms, first + max_wait_ms))
+    return fired
+
+
+def type_key(rnd, blocks, line):
+    """Apply one keystroke at the end of line; returns the cursor line.
+    Edited lines get new Blocks, as the incremental serializer makes."""
+    if rnd.random() < 0.03:
+        blocks.insert(line + 1, Block('paragraph', [Run()]))
+        return line + 1
+    block = blocks[line]
+    runs = block.runs[:-1] + [Run(block.runs[-1].text + rnd.choice('etaoin '),
+                                  block.runs[-1].tags)]
+    blocks[line] = Block(block.type, runs)
+    return line
+
+
+def bench_policy(policy, content, key_times, seed, workdir):
+    journal_ms, delay_ms, max_wait_ms = POLICIES[policy]
+    path = os.path.join(workdir, f'journal-{policy}.db')
+    if os.path.exists(path):
+        os.remove(path)
+    store = NoteStore(path)
+    note = store.create_note(title='typed', content=content)
+    journal_dir = os.path.join(workdir, f'journal-{policy}')
+    journal = EditJournal(note.id, note.title, content, directory=journal_dir)
+    journal_path = os.path.join(journal_dir, note.id + '.jsonl')
+
+    events = [(t, 0, 'key') for t in key_times]
+    events += [(t, 1, 'save') for t in fire_times(key_times, delay_ms, max_wait_ms)]
+    if journal_ms is not None:
+        events += [(t, 2, 'record') for t in fire_times(key_times, journal_ms, journal_ms)]
+    events.sort()
+
+    rnd = random.Random(seed)
+    blocks = list(Document.from_plain_text(content).blocks)
+    line = len(blocks) // 2
+    saves, records = [], []
+    db_bytes = journal_bytes = 0
+    for _, _, kind in events:
+        if kind == 'key':
+            line = type_key(rnd, blocks, line)
+        elif kind == 'record':
+            start = time.perf_counter()
+            journal.record(note.title, Document(list(blocks)))
+            records.append(time.perf_counter() - start)
+        else:
+            checkpoint(path)
+            start = time.perf_counter()
+            content = serialize_document(Document(list(blocks)))
+            if journal_ms is not None:
+                journal.record(note.title, Document(list(blocks)))
+                digest = journal.checkpoint(note.title, content)
+            store.update_note(note.id, content=content)
+            saves.append(time.perf_counter() - start)
+            db_bytes += wal_bytes(path)
+            if journal_ms is not None and os.path.exists(journal_path):
+                journal_bytes += os.path.getsize(journal_path)
+                journal.compact(digest)
+    store.close()
+
+    results = [
+        summarize('save', saves),
+        {'op': 'bytes_written', 'db': db_bytes, 'journal': journal_bytes,
+         'total': db_bytes + journal_bytes},
+    ]
+    if records:
+        results.append(summarize('journal_record', records))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='characters per note')
+    parser.add_argument('--keys', type=int, default=3000,
+                        help='keystrokes in the typing session')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.seed)
+    key_times = typing_session(random.Random(args.seed), args.keys)
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': args.seed,
+        'keys': len(key_times),
+        'session_s': key_times[-1] / 1000,
+        'policies': {name: list(p) for name, p in POLICIES.items()},
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            content = serialize_document(Document.from_plain_text(corpus.pasted_text(size)))
+            for policy in POLICIES:
+                print(f'size={size} policy={policy}', file=sys.stderr)
+                for r in bench_policy(policy, content, key_times, args.seed, workdir):
+                    r.update(policy=policy, note_chars=size)
+                    report['results'].append(r)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
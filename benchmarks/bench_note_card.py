@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+NoteCard construction microbenchmark.
+
+Measures how long building a card and binding it to a note takes, how
+long rebinding a recycled card takes, and how many widgets and event
+controllers each card carries. Needs a display: run it in a desktop
+session or under a headless compositor such as xvfb-run.
+
+    python3 benchmarks/bench_note_card.py --count 500 --output cards.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import gi  # noqa: E402
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+from gi.repository import Gtk  # noqa: E402
+
+from bench_note_store import git_revision, summarize  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.note import NoteSummary  # noqa: E402
+from betternotes.note_card import NoteCard  # noqa: E402
+from betternotes.rich_text import get_plain_text, make_preview  # noqa: E402
+
+
+def summaries(count, seed):
+    corpus = Corpus(seed)
+    return [
+        NoteSummary(
+            id=str(i), title=title, color=color, updated_at='',
+            preview=make_preview(get_plain_text(content)), tags=tags,
+        )
+        for i, (title, content, color, tags) in enumerate(corpus.notes(count))
+    ]
+
+
+def count_widgets(root):
+    """Return (widgets, event controllers) in root's widget tree."""
+    widgets = controllers = 0
+    pending = [root]
+    while pending:
+        widget = pending.pop()
+        widgets += 1
+        controllers += widget.observe_controllers().get_n_items()
+        child = widget.get_first_child()
+        while child is not None:
+            pending.append(child)
+            child = child.get_next_sibling()
+    return widgets, controllers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    if not Gtk.init_check():
+        sys.exit('bench_note_card.py needs a display')
+
+    notes = summaries(args.count, args.seed)
+    cards = []
+    construct = []
+    for note in notes:
+        start = time.perf_counter()
+        cards.append(NoteCard(note))
+        construct.append(time.perf_counter() - start)
+
+    rebind = []
+    for card, note in zip(cards, reversed(notes)):
+        start = time.perf_counter()
+        card.update(note)
+        rebind.append(time.perf_counter() - start)
+
+    widgets, controllers = count_widgets(cards[0])
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'gtk': f'{Gtk.get_major_version()}.{Gtk.get_minor_version()}.'
+               f'{Gtk.get_micro_version()}',
+        'seed': args.seed,
+        'results': [
+            summarize('construct', construct),
+            summarize('rebind', rebind),
+            {'op': 'tree', 'widgets_per_card': widgets,
+             'controllers_per_card': controllers},
+        ],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+NoteStore benchmark suite.
+
+Builds deterministic corpora (see corpus.py) and measures the latency
+and throughput of the store's main operations, and how many SQL
+statements each list call issues, which must not grow with the number of
+notes listed. Write latency and throughput are also measured for each
+durability profile and group-commit window (--group-commit-ms). Runs
+headless: NoteStore only needs GLib.
+
+    python3 benchmarks/bench_note_store.py --sizes 1000 10000 50000 \\
+        --output after.json --compare before.json
+
+Results are written as JSON so runs from different commits can be
+compared with --compare.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from corpus import Corpus  # noqa: E402
+from betternotes.async_store import AsyncNoteStore  # noqa: E402
+from betternotes.constants import GROUP_COMMIT_MS  # noqa: E402
+from betternotes.note_store import DURABILITY_PROFILES, NoteStore  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(op, samples, **extra):
+    total = sum(samples)
+    result = {
+        'op': op,
+        'count': len(samples),
+        'total_s': total,
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'ops_per_s': len(samples) / total if total else None,
+    }
+    result.update(extra)
+    return result
+
+
+def measure(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def queries_per_call(store, func, args_list):
+    """Mean number of SQL statements one call issues, counted through the
+    store's trace hook. Statements run by triggers and FTS5 internals are
+    traced with a leading '--' and not counted."""
+    statements = []
+    store.set_trace_callback(
+        lambda sql: sql.lstrip().startswith('--') or statements.append(sql),
+    )
+    try:
+        for args in args_list:
+            func(*args)
+    finally:
+        store.set_trace_callback(None)
+    return len(statements) / len(args_list)
+
+
+def list_op(store, op, func, args_list, **extra):
+    """Time a list call, and count the statements it issues."""
+    return summarize(op, measure(func, args_list), **extra,
+                     queries_per_call=queries_per_call(store, func, args_list))
+
+
+def list_memory(op, func):
+    """Bytes per note held by the list func() returns."""
+    func()  # warm up connections and caches outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    notes = func()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'op': op, 'rows': len(notes), 'bytes': retained,
+            'bytes_per_note': retained / len(notes) if notes else None}
+
+
+def populate(store, notes):
+    """Bulk-load notes in one transaction; returns their ids."""
+    ids = []
+    with store.transaction():
+        for title, content, color, tags in notes:
+            note = store.create_note(title=title, content=content, color=color)
+            for tag in tags:
+                store.add_tag_to_note(note.id, tag)
+            ids.append(note.id)
+    return ids
+
+
+def bench_size(size, durability, workdir, seed):
+    corpus = Corpus(seed)
+    path = os.path.join(workdir, f'bench-{size}-{durability}.db')
+    store = NoteStore(path, durability=durability)
+    results = []
+
+    # Individually committed creates, then bulk-load the remainder
+    single = corpus.notes(min(size, 1000))
+    ids = []
+    samples = []
+    for title, content, color, tags in single:
+        start = time.perf_counter()
+        ids.append(store.create_note(title=title, content=content, color=color).id)
+        samples.append(time.perf_counter() - start)
+        for tag in tags:
+            store.add_tag_to_note(ids[-1], tag)
+    results.append(summarize('create', samples))
+
+    start = time.perf_counter()
+    ids += populate(store, corpus.notes(size - len(single)))
+    results.append({'op': 'bulk_load', 'count': size - len(single),
+                    'total_s': time.perf_counter() - start})
+
+    targets = corpus.sample(ids, 500)
+    results.append(summarize('update_content', measure(
+        lambda i: store.update_note(i, content=corpus.rich_text()),
+        [(i,) for i in targets],
+    )))
+    results.append(summarize('update_color', measure(
+        lambda i: store.update_note(i, color='blue'),
+        [(i,) for i in targets],
+    )))
+
+    results.append(list_op(store, 'list_page', store.get_notes_page, [()] * 50))
+    results.append(list_op(store, 'list_all', store.get_all_notes, [()] * 3,
+                           rows=size))
+    results.append(list_memory(
+        'list_memory_summary', lambda: store.get_notes_page(limit=size).notes,
+    ))
+
+    popular = corpus.tag_names[:5]
+    results.append(list_op(
+        store, 'tag_filter_page',
+        lambda t: store.get_notes_page(tag_name=t), [(t,) for t in popular],
+    ))
+    results.append(list_op(
+        store, 'tag_filter_all', store.get_notes_by_tag, [(t,) for t in popular],
+    ))
+    results.append(summarize('tag_counts', measure(
+        store.get_all_tags, [()] * 10,
+    )))
+
+    terms = corpus.search_terms(100)
+    results.append(list_op(
+        store, 'search_page', store.search_notes_page, [(t,) for t in terms],
+    ))
+    results.append(list_op(
+        store, 'search_all', store.search_notes, [(t,) for t in terms[:20]],
+    ))
+
+    targets = corpus.sample(ids, 200)
+    results.append(summarize('trash_restore', measure(
+        lambda i: (store.trash_note(i), store.restore_note(i)),
+        [(i,) for i in targets],
+    )))
+
+    bulk = corpus.sample(ids, max(1, size // 10))
+    results.append(summarize('trash_bulk', measure(
+        store.trash_notes, [(bulk,)],
+    ), rows=len(bulk)))
+    results.append(list_op(
+        store, 'trash_page', store.get_trashed_notes_page, [()] * 20,
+    ))
+    results.append(summarize('restore_bulk', measure(
+        store.restore_notes, [(bulk,)],
+    ), rows=len(bulk)))
+
+    store.trash_notes(bulk)
+    results.append(summarize('purge', measure(
+        store.empty_trash, [()],
+    ), rows=len(bulk)))
+
+    store.close()
+    results.append({'op': 'db_size', 'bytes': _db_bytes(path)})
+    for r in results:
+        r.update(size=size, durability=durability, group_commit_ms=0)
+    return results
+
+
+def bench_writes(size, durability, group_commit_ms, workdir, seed, count=500):
+    """Autosave-style content updates issued through the database thread,
+    as the app does, with the given durability and group-commit window."""
+    corpus = Corpus(seed)
+    path = os.path.join(workdir, f'writes-{size}-{durability}-{group_commit_ms}.db')
+    store = AsyncNoteStore(path, durability=durability,
+                           group_commit_ms=group_commit_ms)
+    ids = store.run(populate, corpus.notes(size)).result()
+    targets = corpus.sample(ids, count)
+
+    # What a caller waiting on each write sees; with group commit the
+    # commit itself lands later.
+    latency = summarize('write', measure(
+        lambda i: store.update_note(i, content=corpus.rich_text()),
+        [(i,) for i in targets],
+    ))
+
+    # Writes queued back to back, until all of them are committed
+    contents = [corpus.rich_text() for _ in targets]
+    start = time.perf_counter()
+    for note_id, content in zip(targets, contents):
+        store.submit('update_note', note_id, content=content)
+    store.submit('flush').result()
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    results = [latency, {'op': 'write_throughput', 'count': len(targets),
+                         'total_s': elapsed, 'ops_per_s': len(targets) / elapsed}]
+    for r in results:
+        r.update(size=size, durability=durability, group_commit_ms=group_commit_ms)
+    return results
+
+
+def _db_bytes(path):
+    return sum(
+        os.path.getsize(path + suffix)
+        for suffix in ('', '-wal', '-shm')
+        if os.path.exists(path + suffix)
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    key = lambda r: (r['size'], r['durability'], r.get('group_commit_ms', 0), r['op'])
+    before = {key(r): r for r in baseline['results']}
+    print(f'{"size":>7} {"durability":>10} {"group":>5} {"op":<16} '
+          f'{"before":>10} {"after":>10} {"ratio":>6}')
+    for r in current['results']:
+        old = before.get(key(r))
+        if old is None or 'p50_ms' not in r or 'p50_ms' not in old:
+            continue
+        ratio = r['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+        print(f'{r["size"]:>7} {r["durability"]:>10} {key(r)[2]:>5} {r["op"]:<16} '
+              f'{old["p50_ms"]:>9.3f}ms {r["p50_ms"]:>9.3f}ms {ratio:>6.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--durability', nargs='+', default=sorted(DURABILITY_PROFILES),
+                        choices=sorted(DURABILITY_PROFILES))
+    parser.add_argument('--group-commit-ms', type=int, nargs='+',
+                        default=[0, GROUP_COMMIT_MS],
+                        help='group-commit windows to measure writes under')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='print p50 ratios against an earlier results file')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': args.seed,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            for durability in args.durability:
+                print(f'size={size} durability={durability}', file=sys.stderr)
+                report['results'] += bench_size(size, durability, workdir, args.seed)
+                for group_commit_ms in args.group_commit_ms:
+                    print(f'size={size} durability={durability} '
+                          f'group_commit_ms={group_commit_ms}', file=sys.stderr)
+                    report['results'] += bench_writes(
+                        size, durability, group_commit_ms, workdir, args.seed,
+                    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Overview refresh benchmark.
+
+Opens the main window on a populated store, then fires bursts of store
+writes back to back: note updates, tag additions, trashing and creation.
+After each burst it lets the main loop settle and reports how many change
+batches reached the window and how many refreshes they caused per view,
+with the time of each refresh from request to applied result, as counted
+by the store profiler. Needs a display: run it in a desktop session or
+under a headless compositor such as xvfb-run.
+
+    python3 benchmarks/bench_refresh.py --notes 1000 --events 50
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import gi  # noqa: E402
+gi.require_version('Gtk', '4.0')
+gi.require_version('Adw', '1')
+from gi.repository import Gio, GLib, Gtk  # noqa: E402
+
+from bench_note_store import git_revision, populate  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.application import BetterNotesApp  # noqa: E402
+from betternotes.main_window import MainWindow  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+from betternotes.store_profiler import StoreProfiler  # noqa: E402
+
+# Burst kind -> one write of it, given the store and a note id
+BURSTS = {
+    'updated': lambda store, note_id: store.submit(
+        'update_note', note_id, title='edited'),
+    'tagged': lambda store, note_id: store.submit(
+        'add_tag_to_note', note_id, 'burst'),
+    'trashed': lambda store, note_id: store.submit('trash_note', note_id),
+    'created': lambda store, _: store.submit('create_note', title='new'),
+}
+
+
+def settle(ms):
+    """Run the main loop for ms, delivering store results and frames."""
+    context = GLib.MainContext.default()
+    done = []
+    GLib.timeout_add(ms, lambda: done.append(True))
+    while not done:
+        context.iteration(True)
+
+
+def bench_burst(app, kind, note_ids, settle_ms):
+    batches = []
+    handler = app.connect('notes-changed', lambda app, events: batches.append(events))
+    # A fresh profiler per burst; the window reads it per refresh
+    app._profiler = StoreProfiler()
+    write = BURSTS[kind]
+    for note_id in note_ids:
+        write(app.store, note_id)
+    app.store.wait()
+    settle(settle_ms)
+    app.disconnect(handler)
+
+    views = app.profiler.snapshot()['refreshes']
+    return {
+        'op': 'burst', 'kind': kind, 'events': len(note_ids),
+        'batches': len(batches),
+        'refreshes': sum(view['count'] for view in views.values()),
+        'views': views,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=50,
+                        help='writes per burst')
+    parser.add_argument('--settle-ms', type=int, default=500,
+                        help='main loop time after each burst')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+    if args.notes < args.events * (len(BURSTS) - 1):
+        parser.error('--notes must cover one set of --events per burst')
+
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': args.seed,
+        'notes': args.notes,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        # The app keeps its database and journals under the data dir
+        os.environ['XDG_DATA_HOME'] = workdir
+        if not Gtk.init_check():
+            sys.exit('bench_refresh.py needs a display')
+        report['gtk'] = (f'{Gtk.get_major_version()}.{Gtk.get_minor_version()}.'
+                         f'{Gtk.get_micro_version()}')
+
+        store = NoteStore()
+        note_ids = populate(store, Corpus(args.seed).notes(args.notes))
+        store.close()
+
+        app = BetterNotesApp()
+        app.set_flags(Gio.ApplicationFlags.NON_UNIQUE)
+        app.register(None)
+        window = MainWindow(application=app)
+        window.present()
+        settle(args.settle_ms)
+
+        for i, kind in enumerate(BURSTS):
+            print(f'burst={kind}', file=sys.stderr)
+            if kind == 'created':
+                ids = [None] * args.events
+            else:
+                ids = note_ids[i * args.events:(i + 1) * args.events]
+            report['results'].append(bench_burst(app, kind, ids, args.settle_ms))
+
+        window.destroy()
+        app.store.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Rich-text serializer benchmark.
+
+Loads heavily formatted notes of about 100 KB into GtkTextBuffers and
+times deserialize_to_buffer(), from the legacy format and format v2, and
+serialize_buffer() against the implementations they replaced. Both pairs
+must agree: the serializers on the document they describe (the legacy
+one writes the legacy format), the deserializers on the buffer contents
+they produce, compared by text and serialized form. Needs GTK 4;
+tests/test_rich_text_serializer.py round-trips a fuzz corpus through a
+buffer.
+
+    python3 benchmarks/bench_rich_text.py --notes 5 --output ser.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import gi  # noqa: E402
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk  # noqa: E402
+
+from bench_note_store import git_revision, summarize  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.rich_text import parse_document, serialize_document  # noqa: E402
+from betternotes.rich_text_serializer import (  # noqa: E402
+    TAG_NAMES,
+    _ensure_tags,
+    deserialize_to_buffer,
+    serialize_buffer,
+)
+
+
+# --- Reference: the per-run deserializer before range-based loading ---
+
+def legacy_deserialize_to_buffer(text_buffer, json_str):
+    text_buffer.set_text('')
+
+    if not json_str:
+        return
+
+    try:
+        data = json.loads(json_str)
+    except (json.JSONDecodeError, TypeError):
+        text_buffer.set_text(json_str)
+        return
+
+    blocks = data.get('blocks', [])
+    if not blocks:
+        return
+
+    _ensure_tags(text_buffer)
+
+    for block_idx, block in enumerate(blocks):
+        if block_idx > 0:
+            text_buffer.insert(text_buffer.get_end_iter(), '\n')
+
+        block_start_offset = text_buffer.get_end_iter().get_offset()
+        block_type = block.get('type', 'paragraph')
+
+        for run in block.get('runs', []):
+            text = run.get('text', '')
+            if not text:
+                continue
+
+            start_offset = text_buffer.get_end_iter().get_offset()
+            text_buffer.insert(text_buffer.get_end_iter(), text)
+
+            run_start = text_buffer.get_iter_at_offset(start_offset)
+            run_end = text_buffer.get_end_iter()
+            for tag_name in run.get('tags', []):
+                if tag_name in TAG_NAMES:
+                    tag = text_buffer.get_tag_table().lookup(tag_name)
+                    if tag:
+                        text_buffer.apply_tag(tag, run_start, run_end)
+
+        if block_type == 'bullet':
+            line_start = text_buffer.get_iter_at_offset(block_start_offset)
+            line_end = text_buffer.get_end_iter()
+            bullet_tag = text_buffer.get_tag_table().lookup('bullet')
+            if bullet_tag:
+                text_buffer.apply_tag(bullet_tag, line_start, line_end)
+
+
+# --- Reference: the serializer before the single-pass rewrite ---
+
+def legacy_serialize_buffer(text_buffer):
+    blocks = []
+    start = text_buffer.get_start_iter()
+    end = text_buffer.get_end_iter()
+
+    if start.equal(end):
+        return json.dumps({'blocks': []})
+
+    full_text = text_buffer.get_text(start, end, True)
+    lines = full_text.split('\n')
+
+    line_start = text_buffer.get_start_iter()
+
+    for line_idx, line_text in enumerate(lines):
+        line_end = line_start.copy()
+        line_end.forward_chars(len(line_text))
+
+        runs = _legacy_extract_runs(text_buffer, line_start, line_end)
+
+        block_type = 'paragraph'
+        bullet_tag = text_buffer.get_tag_table().lookup('bullet')
+        if bullet_tag and line_start.has_tag(bullet_tag):
+            block_type = 'bullet'
+
+        blocks.append({'type': block_type, 'runs': runs})
+
+        if line_idx < len(lines) - 1:
+            line_start = line_end.copy()
+            line_start.forward_char()
+        else:
+            line_start = line_end
+
+    return json.dumps({'blocks': blocks})
+
+
+def _legacy_extract_runs(text_buffer, start, end):
+    runs = []
+    if start.equal(end):
+        return [{'text': '', 'tags': []}]
+
+    it = start.copy()
+    while it.compare(end) < 0:
+        active_tags = _legacy_tag_names(it)
+
+        run_end = it.copy()
+        while run_end.compare(end) < 0:
+            if not run_end.forward_to_tag_toggle(None):
+                run_end = end.copy()
+                break
+            if run_end.compare(end) >= 0:
+                run_end = end.copy()
+                break
+            if _legacy_tag_names(run_end) != active_tags:
+                break
+
+        text = text_buffer.get_text(it, run_end, True)
+        if text:
+            runs.append({'text': text, 'tags': sorted(active_tags)})
+
+        it = run_end.copy()
+
+    if not runs:
+        runs = [{'text': '', 'tags': []}]
+
+    return runs
+
+
+def _legacy_tag_names(text_iter):
+    names = set()
+    for tag in text_iter.get_tags():
+        name = tag.get_property('name')
+        if name in TAG_NAMES:
+            names.add(name)
+    return names
+
+
+def _text(text_buffer):
+    return text_buffer.get_text(
+        text_buffer.get_start_iter(), text_buffer.get_end_iter(), True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notes', type=int, default=5)
+    parser.add_argument('--size', type=int, default=100_000,
+                        help='approximate characters per note')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.seed)
+    documents = [corpus.formatted_rich_text(args.size) for _ in range(args.notes)]
+    buffers = [Gtk.TextBuffer() for _ in documents]
+
+    v2_documents = [serialize_document(parse_document(d)) for d in documents]
+    samples = {
+        'deserialize': [], 'deserialize_v2': [], 'deserialize_legacy': [],
+        'serialize': [], 'serialize_legacy': [],
+    }
+    mismatches = 0
+    for _ in range(args.repeat):
+        for text_buffer, document in zip(buffers, documents):
+            reference = Gtk.TextBuffer()
+            start = time.perf_counter()
+            legacy_deserialize_to_buffer(reference, document)
+            samples['deserialize_legacy'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            deserialize_to_buffer(text_buffer, document)
+            samples['deserialize'].append(time.perf_counter() - start)
+
+            mismatches += (
+                _text(text_buffer) != _text(reference)
+                or legacy_serialize_buffer(text_buffer)
+                != legacy_serialize_buffer(reference)
+            )
+
+        for text_buffer, document in zip(buffers, v2_documents):
+            start = time.perf_counter()
+            deserialize_to_buffer(text_buffer, document)
+            samples['deserialize_v2'].append(time.perf_counter() - start)
+
+        for text_buffer in buffers:
+            start = time.perf_counter()
+            current = serialize_buffer(text_buffer)
+            samples['serialize'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            legacy = legacy_serialize_buffer(text_buffer)
+            samples['serialize_legacy'].append(time.perf_counter() - start)
+
+            mismatches += parse_document(current) != parse_document(legacy)
+
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'note_chars': [b.get_char_count() for b in buffers],
+        'mismatches': mismatches,
+        'results': [summarize(op, s) for op, s in samples.items()],
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if mismatches:
+        sys.exit(f'{mismatches} results differ from the legacy implementations')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Deterministic synthetic note corpora for benchmarks.
+
+The same seed always yields the same notes, so results from different
+commits are comparable.
+"""
+
+import itertools
+import json
+import random
+
+FORMAT_TAGS = ('bold', 'italic', 'underline', 'strikethrough')
+# Every subset of FORMAT_TAGS, each sorted as the serializers write it
+TAG_COMBINATIONS = [
+    list(combo)
+    for n in range(len(FORMAT_TAGS) + 1)
+    for combo in itertools.combinations(sorted(FORMAT_TAGS), n)
+]
+# Characters the fuzz corpus draws on: JSON escapes, accents, CJK,
+# astral-plane emoji and a ZWJ sequence, besides plain ASCII.
+FUZZ_ALPHABET = (
+    'abc XYZ 019', '"', '\\', '/', '\t', '\u00e9', '\u00df', '\u4e2d\u6587',
+    '\U0001f600', '\U0001f469\u200d\U0001f4bb', '\u0301', '\u00a0', '<&>',
+)
+COLORS = ('yellow', 'blue', 'green', 'pink', 'orange', 'purple', 'red', 'teal')
+TAG_POOL_SIZE = 50
+
+
+class Corpus:
+
+    def __init__(self, seed=0):
+        self._rnd = random.Random(seed)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        self.vocabulary = [
+            ''.join(self._rnd.choice(letters) for _ in range(self._rnd.randint(2, 10)))
+            for _ in range(5000)
+        ]
+        self.tag_names = [f'tag{i:02d}' for i in range(TAG_POOL_SIZE)]
+        # Zipf-like tag popularity: a few tags are on most tagged notes.
+        self._tag_weights = [1 / (i + 1) for i in range(TAG_POOL_SIZE)]
+
+    def words(self, count):
+        return ' '.join(self._rnd.choices(self.vocabulary, k=count))
+
+    def rich_text(self, max_blocks=12):
+        """Return a note body in the legacy rich-text format."""
+        blocks = []
+        for _ in range(self._rnd.randint(1, max_blocks)):
+            runs = []
+            for _ in range(self._rnd.randint(1, 4)):
+                # Most text is unformatted; some runs carry 1-2 tags.
+                n_tags = self._rnd.choices((0, 1, 2), weights=(6, 3, 1))[0]
+                tags = sorted(self._rnd.sample(FORMAT_TAGS, n_tags))
+                runs.append({'text': self.words(self._rnd.randint(1, 12)) + ' ',
+                             'tags': tags})
+            block_type = 'bullet' if self._rnd.random() < 0.2 else 'paragraph'
+            blocks.append({'type': block_type, 'runs': runs})
+        return json.dumps({'blocks': blocks})
+
+    def formatted_rich_text(self, size):
+        """Return a note body of about size characters made of short,
+        mostly formatted runs: the worst case for the serializers."""
+        blocks = []
+        length = 0
+        while length < size:
+            runs = []
+            for _ in range(self._rnd.randint(4, 16)):
+                n_tags = self._rnd.choices((0, 1, 2, 3), weights=(1, 3, 2, 1))[0]
+                text = self.words(self._rnd.randint(1, 3)) + ' '
+                runs.append({'text': text,
+                             'tags': sorted(self._rnd.sample(FORMAT_TAGS, n_tags))})
+                length += len(text)
+            block_type = 'bullet' if self._rnd.random() < 0.3 else 'paragraph'
+            blocks.append({'type': block_type, 'runs': runs})
+            length += 1
+        return json.dumps({'blocks': blocks})
+
+    def pasted_text(self, size):
+        """Return about size characters of unformatted text in short
+        lines, like a long paste."""
+        lines = []
+        length = 0
+        while length < size:
+            lines.append(self.words(self._rnd.randint(4, 14)))
+            length += len(lines[-1]) + 1
+        return '\n'.join(lines)
+
+    def tag_combinations_rich_text(self):
+        """Return a note body with a run of every tag combination, once
+        in paragraphs and once in bullets."""
+        blocks = []
+        for block_type in ('paragraph', 'bullet'):
+            runs = [{'text': f'{block_type} {"+".join(tags) or "plain"} ',
+                     'tags': tags} for tags in TAG_COMBINATIONS]
+            blocks.append({'type': block_type, 'runs': runs})
+            # The same combinations again, each as a whole line
+            for tags in TAG_COMBINATIONS:
+                blocks.append({'type': block_type,
+                               'runs': [{'text': 'line', 'tags': tags}]})
+        return json.dumps({'blocks': blocks})
+
+    def fuzz_rich_text(self, max_blocks=8):
+        """Return a random note body in canonical form, i.e. exactly as
+        serialize_buffer() would write it back: adjacent runs differ in
+        tags, only empty lines have an empty run, and those are never
+        bullets. An empty buffer has no blocks rather than one empty
+        line."""
+        blocks = []
+        for _ in range(self._rnd.randint(0, max_blocks)):
+            runs = []
+            for _ in range(self._rnd.choices((0, 1, 2, 5), weights=(1, 3, 2, 2))[0]):
+                tags = self._rnd.choice(TAG_COMBINATIONS)
+                if runs and runs[-1]['tags'] == tags:
+                    continue
+                text = ''.join(self._rnd.choices(FUZZ_ALPHABET, k=self._rnd.randint(1, 4)))
+                runs.append({'text': text, 'tags': tags})
+            if not runs:
+                blocks.append({'type': 'paragraph',
+                               'runs': [{'text': '', 'tags': []}]})
+                continue
+            block_type = 'bullet' if self._rnd.random() < 0.3 else 'paragraph'
+            blocks.append({'type': block_type, 'runs': runs})
+        if len(blocks) == 1 and not blocks[0]['runs'][0]['text']:
+            blocks = []
+        return json.dumps({'blocks': blocks})
+
+    def tags(self):
+        count = self._rnd.choices((0, 1, 2, 3), weights=(4, 3, 2, 1))[0]
+        return sorted(set(self._rnd.choices(
+            self.tag_names, weights=self._tag_weights, k=count,
+        )))
+
+    def note(self):
+        """Return (title, content, color, tags) for one note."""
+        return (
+            self.words(self._rnd.randint(1, 5)),
+            self.rich_text(),
+            self._rnd.choice(COLORS),
+            self.tags(),
+        )
+
+    def notes(self, count):
+        return [self.note() for _ in range(count)]
+
+    def search_terms(self, count):
+        return self._rnd.sample(self.vocabulary, count)
+
+    def sample(self, population, count):
+        return self._rnd.sample(population, min(count, len(population)))
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+NoteStore concurrency stress test.
+
+Hammers one store from several writer and reader threads at once and
+fails on any error or inconsistency. Runs twice: on a NoteStore shared by
+all threads and committing every write, so reads go through the pool of
+read-only connections, and on an AsyncNoteStore with group commit on, so
+reads also go through the write barrier and, while a group commit is
+pending, the writer connection.
+
+Each writer owns one note and retitles it with an increasing counter,
+then reads the note back and must see its own write. Readers list,
+search and count tags concurrently and must never see a note's counter
+go backwards.
+
+Last, one thread keeps the AsyncNoteStore's write queue full while
+another connection watches for the writes to commit: a group commit
+must land within the window even when the queue never empties. Runs
+headless: NoteStore only needs GLib.
+
+    python3 benchmarks/stress_note_store.py --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_note_store import git_revision, populate  # noqa: E402
+from corpus import Corpus  # noqa: E402
+from betternotes.async_store import AsyncNoteStore  # noqa: E402
+from betternotes.constants import GROUP_COMMIT_MS  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+
+
+class Run:
+    """Shared state of one stress run."""
+
+    def __init__(self, note_ids, seconds):
+        self.note_ids = note_ids
+        self.seconds = seconds
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.errors = []
+        self.ops = {'writes': 0, 'reads': 0}
+
+    def count(self, kind, n=1):
+        with self.lock:
+            self.ops[kind] += n
+
+    def fail(self, message):
+        with self.lock:
+            self.errors.append(message)
+
+    def loop(self, func, *args):
+        """Call func(*args) until stopped, recording any exception."""
+        def target():
+            try:
+                while not self.stop.is_set():
+                    func(*args)
+            except Exception:
+                self.fail(traceback.format_exc())
+        return threading.Thread(target=target)
+
+    def run(self, threads):
+        for thread in threads:
+            thread.start()
+        self.stop.wait(self.seconds)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _title(writer, n):
+    return f'w{writer} {n}'
+
+
+def _counter(title):
+    return int(title.rsplit(' ', 1)[1])
+
+
+class Writer:
+    """Retitles one note with an increasing counter and checks that it
+    reads each write back, tagging it now and then in a transaction."""
+
+    def __init__(self, run, index, write, read):
+        self.run = run
+        self.index = index
+        self.note_id = run.note_ids[index]
+        self.write = write
+        self.read = read
+        self.n = 0
+
+    def __call__(self):
+        self.n += 1
+        title = _title(self.index, self.n)
+        self.write(self.note_id, title, self.n % 10 == 0)
+        note = self.read(self.note_id)
+        self.run.count('writes')
+        self.run.count('reads')
+        if note is None or note.title != title:
+            self.run.fail(f'writer {self.index} wrote {title!r} but read '
+                          f'{note.title if note else None!r}')
+
+
+class Reader:
+    """Runs the list queries in turn, checking that no note's counter
+    goes backwards between them."""
+
+    def __init__(self, run, call):
+        self.run = run
+        self.call = call
+        self.owned = set(run.note_ids)
+        self.seen = {}
+        self.queries = [
+            lambda: self.call('get_notes_page').notes,
+            lambda: self.call('search_notes_page', 'w').notes,
+            lambda: self.call('get_note_summaries', self.run.note_ids),
+            lambda: self.call('get_trashed_notes_page').notes,
+            lambda: self.call('get_all_tags'),
+        ]
+        self.i = 0
+
+    def __call__(self):
+        results = self.queries[self.i % len(self.queries)]()
+        self.i += 1
+        self.run.count('reads')
+        for note in results:
+            if note.id not in self.owned:
+                continue  # other notes, or tags
+            n = _counter(note.title)
+            if n < self.seen.get(note.id, 0):
+                self.run.fail(f'note {note.id} went back from {self.seen[note.id]} to {n}')
+            self.seen[note.id] = n
+
+
+def stress_shared(path, note_ids, args):
+    """All threads call one NoteStore directly; every write commits."""
+    store = NoteStore(path)
+    run = Run(note_ids, args.seconds)
+
+    def write(note_id, title, tag):
+        if tag:
+            with store.transaction():
+                store.add_tag_to_note(note_id, title.split()[0])
+                store.update_note(note_id, title=title)
+        else:
+            store.update_note(note_id, title=title)
+
+    threads = [run.loop(Writer(run, i, write, store.get_note))
+               for i in range(args.writers)]
+    threads += [run.loop(Reader(run, lambda m, *a: getattr(store, m)(*a)))
+                for _ in range(args.readers)]
+    run.run(threads)
+    pooled = store._read_pool.qsize()
+    store.close()
+    return run, pooled
+
+
+def stress_async(path, note_ids, args):
+    """Threads submit to an AsyncNoteStore with group commit on."""
+    store = AsyncNoteStore(path, group_commit_ms=args.group_commit_ms)
+    run = Run(note_ids, args.seconds)
+
+    def write(note_id, title, tag):
+        # Not waited for: the read after it must still see it
+        if tag:
+            store.submit('add_tag_to_note', note_id, title.split()[0])
+        store.submit('update_note', note_id, title=title)
+
+    def read(note_id):
+        return store.submit('get_note', note_id).result()
+
+    threads = [run.loop(Writer(run, i, write, read)) for i in range(args.writers)]
+    threads += [run.loop(Reader(run, lambda m, *a: store.submit(m, *a).result()))
+                for _ in range(args.readers)]
+    run.run(threads)
+    pooled = store._store._read_pool.qsize()
+    store.close()
+    return run, pooled
+
+
+def commit_gaps(path, note_id, args):
+    """Keep the write queue busy for args.seconds and return the longest
+    stretch, in ms, during which another connection saw no new commit."""
+    store = AsyncNoteStore(path, group_commit_ms=args.group_commit_ms)
+    stop = threading.Event()
+
+    def feed():
+        # Keep about 1000 writes queued so the queue never runs dry
+        queued = []
+        n = 0
+        while not stop.is_set():
+            n += 1
+            queued.append(store.submit('update_note', note_id, title=_title(0, n)))
+            if len(queued) > 1000:
+                queued.pop(0).result()
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    db = sqlite3.connect(path)
+    longest = 0.0
+    seen = None
+    changed_at = start = time.monotonic()
+    while time.monotonic() - start < args.seconds:
+        title = db.execute('SELECT title FROM notes WHERE id = ?', (note_id,)).fetchone()[0]
+        now = time.monotonic()
+        if title != seen:
+            seen, changed_at = title, now
+        longest = max(longest, now - changed_at)
+        time.sleep(0.005)
+    stop.set()
+    feeder.join()
+    db.close()
+    store.close()
+    return longest * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--notes', type=int, default=1000,
+                        help='notes in the store besides the writers\' own')
+    parser.add_argument('--group-commit-ms', type=int, default=GROUP_COMMIT_MS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'writers': args.writers,
+        'readers': args.readers,
+        'seconds': args.seconds,
+        'results': [],
+    }
+    errors = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode, stress in (('shared', stress_shared), ('async', stress_async)):
+            print(f'mode={mode}', file=sys.stderr)
+            path = os.path.join(workdir, f'stress-{mode}.db')
+            store = NoteStore(path)
+            populate(store, Corpus(args.seed).notes(args.notes))
+            note_ids = [store.create_note(title=_title(i, 0)).id
+                        for i in range(args.writers)]
+            store.close()
+
+            run, pooled = stress(path, note_ids, args)
+            report['results'].append({
+                'mode': mode, 'errors': len(run.errors),
+                'pooled_connections': pooled, **run.ops,
+            })
+            errors += [f'{mode}: {e}' for e in run.errors]
+
+        print('mode=commit_latency', file=sys.stderr)
+        path = os.path.join(workdir, 'stress-latency.db')
+        store = NoteStore(path)
+        note_id = store.create_note(title=_title(0, 0)).id
+        store.close()
+        gap_ms = commit_gaps(path, note_id, args)
+        # Generous slack for slow machines; a stalled commit waits for
+        # the whole run
+        limit_ms = args.group_commit_ms + 500
+        report['results'].append({
+            'mode': 'commit_latency', 'group_commit_ms': args.group_commit_ms,
+            'max_commit_gap_ms': round(gap_ms, 1), 'limit_ms': limit_ms,
+        })
+        if gap_ms > limit_ms:
+            errors.append(f'commit_latency: no commit for {gap_ms:.0f}ms '
+                          f'with a {args.group_commit_ms}ms group-commit window')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    for error in errors[:10]:
+        print(error, file=sys.stderr)
+    if errors:
+        sys.exit(f'{len(errors)} errors under concurrent load')
+
+
+if __name__ == '__main__':
+    main()
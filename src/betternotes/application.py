@@ -7,19 +7,18 @@ gi.require_version('Adw', '1')
 
 from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
 
-from betternotes.constants import APP_ID
-from betternotes.note_store import NoteStore
+from betternotes.constants import APP_ID, GROUP_COMMIT_MS
+from betternotes.async_store import AsyncNoteStore
+from betternotes.edit_journal import recover_journals
 from betternotes.main_window import MainWindow
+from betternotes.store_profiler import PROFILE_ENV, StoreProfiler
 
 
 class BetterNotesApp(Adw.Application):
 
     __gsignals__ = {
-        'note-changed': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'note-created': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'note-trashed': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'note-restored': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'note-deleted': (GObject.SignalFlags.RUN_LAST, None, (str,)),
+        # One batch of ChangeEvents per store write or transaction
+        'notes-changed': (GObject.SignalFlags.RUN_LAST, None, (object,)),
     }
 
     def __init__(self, version='0.1.2', **kwargs):
@@ -30,14 +29,44 @@ class BetterNotesApp(Adw.Application):
         )
         self.version = version
         self.store = None
+        self._profiler = None
         self._note_windows = {}
 
+    @property
+    def profiler(self):
+        """The StoreProfiler when BETTERNOTES_PROFILE is set, else None."""
+        return self._profiler
+
     def do_startup(self):
         Adw.Application.do_startup(self)
-        self.store = NoteStore()
+        self.store = AsyncNoteStore(group_commit_ms=GROUP_COMMIT_MS)
+        # Replay edits note windows journaled but never saved (a crash)
+        self.store.run(recover_journals).result()
+        self.store.subscribe(lambda events: self.emit('notes-changed', events))
         self._load_css()
         self._setup_actions()
         self._setup_shortcuts()
+        if os.environ.get(PROFILE_ENV):
+            self._setup_profiler()
+
+    def do_shutdown(self):
+        if self.store is not None:
+            self.store.close()
+        if self._profiler is not None:
+            self._profiler.dump(os.environ[PROFILE_ENV])
+        Adw.Application.do_shutdown(self)
+
+    def _setup_profiler(self):
+        self._profiler = StoreProfiler()
+        self.store.run(self._profiler.instrument).result()
+
+        action = Gio.SimpleAction.new('dump-profile', None)
+        action.connect('activate', self._on_dump_profile)
+        self.add_action(action)
+        self.set_accels_for_action('app.dump-profile', ['<Control><Shift><Alt>p'])
+
+    def _on_dump_profile(self, action, param):
+        self._profiler.dump(os.environ[PROFILE_ENV])
 
     def _load_css(self):
         css_provider = Gtk.CssProvider()
@@ -143,7 +172,6 @@ class BetterNotesApp(Adw.Application):
             color = settings.get_string('default-color') or DEFAULT_COLOR
 
         note = self.store.create_note(title='', content='', color=color)
-        self.emit('note-created', note.id)
         self.open_note(note.id)
 
     def _on_about(self, action, param):
@@ -0,0 +1,182 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from gi.repository import GLib
+
+from betternotes.constants import READ_POOL_SIZE
+from betternotes.note_store import READ_METHODS, NoteStore
+
+logger = logging.getLogger(__name__)
+
+_SHUTDOWN = object()
+
+
+class _WorkerNoteStore(NoteStore):
+    """NoteStore whose group commits are driven by the worker loop
+    instead of GLib timeouts, so the connection never leaves its thread."""
+
+    flush_deadline = None
+
+    def _schedule_flush(self):
+        if self.flush_deadline is None:
+            self.flush_deadline = time.monotonic() + self._group_commit_ms / 1000
+
+    def flush(self):
+        self.flush_deadline = None
+        super().flush()
+
+
+class AsyncNoteStore:
+    """Runs NoteStore calls off the GTK main thread.
+
+    Writes execute one at a time on a dedicated database thread in
+    submission order, so writes to a note can never overtake each other.
+    Reads run concurrently on a small pool of threads backed by the
+    store's read-only connections; each read first waits for the writes
+    submitted before it, so it always sees them. Results are handed back
+    on the GTK main loop.
+
+    Attribute access falls through to synchronous proxies of the
+    NoteStore methods, which block until the call has run.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, args=(args, kwargs),
+            name='betternotes-db', daemon=True,
+        )
+        self._closed = False
+        self._ready = Future()
+        self._thread.start()
+        self._store = self._ready.result()
+
+        self._last_write = None
+        self._readers = ThreadPoolExecutor(
+            max_workers=kwargs.get('read_pool_size', READ_POOL_SIZE) or 1,
+            thread_name_prefix='betternotes-read',
+        )
+
+    def submit(self, method, *args, callback=None, **kwargs) -> Future:
+        """Queue store.method(*args, **kwargs).
+
+        If given, callback(result) is invoked on the main loop afterwards.
+        """
+        func = getattr(self._store, method)
+        if method in READ_METHODS:
+            return self._read(func, args, kwargs, callback)
+        return self._enqueue(func, args, kwargs, callback)
+
+    def run(self, func, *args, callback=None) -> Future:
+        """Queue func(store, *args) as one unit of work on the database
+        thread, e.g. to wrap several calls in store.transaction()."""
+        return self._enqueue(func, (self._store,) + args, {}, callback)
+
+    def subscribe(self, callback):
+        """Call callback(events) on the main loop with each batch of
+        ChangeEvents the store publishes, in commit order."""
+        self._store.subscribe(
+            lambda events: GLib.idle_add(self._deliver_events, callback, events),
+        )
+
+    def wait(self):
+        """Block until everything submitted so far has run."""
+        self._enqueue(lambda: None, (), {}, None).result()
+
+    def close(self):
+        """Finish all queued work, flush pending commits and close."""
+        if self._closed:
+            return
+        self._closed = True
+        self._readers.shutdown(wait=True)
+        self._queue.put(_SHUTDOWN)
+        self._thread.join()
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(NoteStore, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.submit(name, *args, **kwargs).result()
+        return call
+
+    def _enqueue(self, func, args, kwargs, callback):
+        if self._closed:
+            raise RuntimeError('Store is closed')
+        future = Future()
+        self._add_callback(future, callback)
+        self._queue.put((future, func, args, kwargs))
+        self._last_write = future
+        return future
+
+    def _read(self, func, args, kwargs, callback):
+        if self._closed:
+            raise RuntimeError('Store is closed')
+        barrier = self._last_write
+
+        def task():
+            if barrier is not None:
+                wait([barrier])
+            return func(*args, **kwargs)
+
+        future = self._readers.submit(task)
+        self._add_callback(future, callback)
+        return future
+
+    def _add_callback(self, future, callback):
+        if callback is not None:
+            future.add_done_callback(
+                lambda f: GLib.idle_add(self._deliver, f, callback),
+            )
+
+    @staticmethod
+    def _deliver(future, callback):
+        exc = future.exception()
+        if exc is not None:
+            logger.error('Store call failed', exc_info=exc)
+        else:
+            callback(future.result())
+        return GLib.SOURCE_REMOVE
+
+    @staticmethod
+    def _deliver_events(callback, events):
+        callback(events)
+        return GLib.SOURCE_REMOVE
+
+    def _run(self, args, kwargs):
+        try:
+            store = _WorkerNoteStore(*args, **kwargs)
+        except BaseException as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(store)
+
+        while True:
+            timeout = None
+            if store.flush_deadline is not None:
+                timeout = store.flush_deadline - time.monotonic()
+                if timeout <= 0:
+                    # Due: commit now, even if more work is already queued
+                    store.flush()
+                    continue
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                store.flush()
+                continue
+            if item is _SHUTDOWN:
+                break
+            future, func, call_args, call_kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*call_args, **call_kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        store.close()
@@ -1,22 +1,51 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import hashlib
+
 from gi.repository import GLib
 
-from betternotes.constants import AUTOSAVE_DELAY_MS
+from betternotes.constants import AUTOSAVE_DELAY_MS, AUTOSAVE_MAX_WAIT_MS
 
 
 class AutoSave:
-    """Debounced auto-save using GLib.timeout_add."""
+    """Debounced auto-save using GLib timeouts.
+
+    trigger() schedules a save delay_ms after the latest call, but no
+    later than max_wait_ms after the first call of a burst, so continuous
+    typing still saves regularly. Timers run at idle priority, behind
+    input handling and drawing.
+
+    A save calls collect() for the values to store and passes them to
+    persist(), unless they hash the same as the values last persisted or
+    still being persisted. persist() may return a Future of the write:
+    the values then only count as persisted once it succeeds, and if it
+    fails the next save writes them again. saves and skips count the two
+    outcomes.
+    """
 
-    def __init__(self, save_callback, delay_ms=AUTOSAVE_DELAY_MS):
-        self._save_callback = save_callback
+    def __init__(self, collect, persist, delay_ms=AUTOSAVE_DELAY_MS,
+                 max_wait_ms=AUTOSAVE_MAX_WAIT_MS):
+        self._collect = collect
+        self._persist = persist
         self._delay_ms = delay_ms
+        self._max_wait_ms = max_wait_ms
         self._timeout_id = None
+        self._first_trigger = 0  # µs, monotonic
+        self._last_trigger = 0
+        self._saved_hash = None
+        self._pending = None  # (Future, hash) of the latest write in flight
+        self.saves = 0
+        self.skips = 0
 
     def trigger(self):
-        """Schedule a save after the debounce delay. Resets if called again."""
-        self.cancel()
-        self._timeout_id = GLib.timeout_add(self._delay_ms, self._do_save)
+        """Schedule a save after the debounce delay. Calling again pushes
+        it back, up to the max-wait cap."""
+        now = GLib.get_monotonic_time()
+        self._last_trigger = now
+        if self._timeout_id is None:
+            # Re-arming happens when the timer fires, not per call
+            self._first_trigger = now
+            self._schedule(self._delay_ms)
 
     def cancel(self):
         """Cancel any pending save."""
@@ -27,9 +56,65 @@ class AutoSave:
     def save_now(self):
         """Save immediately, canceling any pending debounce."""
         self.cancel()
-        self._save_callback()
+        self._save()
+
+    def mark_saved(self, *values):
+        """Record values as already persisted, e.g. those just loaded."""
+        self._saved_hash = _hash(values)
+
+    def _schedule(self, delay_ms):
+        self._timeout_id = GLib.timeout_add(
+            delay_ms, self._on_timeout, priority=GLib.PRIORITY_DEFAULT_IDLE,
+        )
+
+    def _on_timeout(self):
+        now = GLib.get_monotonic_time()
+        remaining_ms = self._delay_ms - (now - self._last_trigger) // 1000
+        if self._max_wait_ms is not None:
+            waited_ms = (now - self._first_trigger) // 1000
+            remaining_ms = min(remaining_ms, self._max_wait_ms - waited_ms)
+        if remaining_ms > 0:
+            self._schedule(remaining_ms)
+            return GLib.SOURCE_REMOVE
 
-    def _do_save(self):
         self._timeout_id = None
-        self._save_callback()
+        self._save()
+        return GLib.SOURCE_REMOVE
+
+    def _save(self):
+        values = self._collect()
+        digest = _hash(values)
+        if digest == self._saved_hash or (
+                self._pending is not None and digest == self._pending[1]):
+            self.skips += 1
+            return
+        self.saves += 1
+        # Until this write lands, what is stored is unknown
+        self._saved_hash = None
+        self._pending = None
+        future = self._persist(*values)
+        if future is None:
+            self._saved_hash = digest
+            return
+        self._pending = (future, digest)
+        future.add_done_callback(
+            lambda f: GLib.idle_add(self._on_persisted, f, digest),
+        )
+
+    def _on_persisted(self, future, digest):
+        # Only the latest write says what is stored
+        if self._pending is None or self._pending[0] is not future:
+            return GLib.SOURCE_REMOVE
+        self._pending = None
+        if future.exception() is None:
+            self._saved_hash = digest
         return GLib.SOURCE_REMOVE
+
+
+def _hash(values):
+    h = hashlib.blake2b(digest_size=16)
+    for value in values:
+        data = value.encode()
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+    return h.digest()
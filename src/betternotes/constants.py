@@ -3,4 +3,11 @@
 APP_ID = 'com.github.paperhead.BetterNotes'
 APP_NAME = 'BetterNotes'
 TRASH_RETENTION_DAYS = 30
-AUTOSAVE_DELAY_MS = 500
+JOURNAL_DELAY_MS = 500
+AUTOSAVE_DELAY_MS = 5000
+AUTOSAVE_MAX_WAIT_MS = 30000
+NOTES_PAGE_SIZE = 60
+DEFAULT_DURABILITY = 'normal'
+GROUP_COMMIT_MS = 150
+READ_POOL_SIZE = 3
+CONTENT_COMPRESS_MIN_BYTES = 4096
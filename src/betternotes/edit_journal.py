@@ -0,0 +1,242 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Append-only journal of a note's edits not yet saved to the database.
+
+While a note is open its window appends what changed every
+JOURNAL_DELAY_MS to <data dir>/betternotes/journal/<note id>.jsonl, one
+JSON record per line:
+
+    {"checkpoint": "<digest>"}
+    {"title": "Groceries"}
+    {"line": 3, "remove": 1, "blocks": [["bullet", [["milk", ["bold"]]]]]}
+
+A checkpoint names a state of the note, by the digest of its title and
+content, that has been handed to the store: the file starts with the
+state the edits apply to, and each database save appends another.
+Other records change the title, or replace `remove` lines from `line`
+on with the given blocks ([type, [[text, tags], ...]] per line).
+
+The window compacts the journal as each save commits. On closing it
+deletes it from the database thread once the last save has committed,
+so that this still happens when the application quits. A journal still
+present at startup is left from a crash or a failed save:
+recover_journals() finds the checkpoint matching what the database
+holds and applies the records after it. The journal is written
+without fsync, so it survives the application crashing; like the
+database at 'normal' durability, a power loss may drop the last records.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from gi.repository import GLib
+
+from betternotes.rich_text import (
+    Block,
+    Document,
+    Run,
+    parse_document,
+    serialize_document,
+)
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = '.jsonl'
+
+
+def journal_dir():
+    return os.path.join(GLib.get_user_data_dir(), 'betternotes', 'journal')
+
+
+def state_digest(title, content):
+    """Digest identifying a note's title and content."""
+    h = hashlib.blake2b(digest_size=16)
+    for value in (title, content):
+        data = value.encode()
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+    return h.hexdigest()
+
+
+class EditJournal:
+    """The journal of one open note.
+
+    title and content are the note as stored; the file is only created
+    once there is something to record. Not thread-safe: one thread at a
+    time may use it.
+    """
+
+    def __init__(self, note_id, title, content, directory=None):
+        self._dir = directory or journal_dir()
+        self._path = os.path.join(self._dir, note_id + _SUFFIX)
+        self._fd = None
+        self._title = title
+        # Lines as of the last record, compared with the next by identity
+        # first: the serializer keeps the Blocks of unedited lines.
+        self._blocks = parse_document(content).blocks
+        # Checkpoints of the last recorded state: those written since the
+        # last record, or those to start the file with
+        self._head = [state_digest(title, content)]
+
+    def record(self, title, document):
+        """Append the changes that turn the last recorded state into
+        title and document."""
+        record = {}
+        if title != self._title:
+            record['title'] = title
+        splice = _splice(self._blocks, document.blocks)
+        if splice is not None:
+            line, remove, blocks = splice
+            record['line'] = line
+            record['remove'] = remove
+            record['blocks'] = [_encode_block(block) for block in blocks]
+        if not record:
+            return
+        data = _dump(record)
+        if self._fd is None:
+            os.makedirs(self._dir, exist_ok=True)
+            self._fd = os.open(
+                self._path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+                0o600,
+            )
+            data = b''.join(_dump({'checkpoint': d}) for d in self._head) + data
+        os.write(self._fd, data)
+        self._title = title
+        self._blocks = list(document.blocks)
+        self._head = []
+
+    def checkpoint(self, title, content):
+        """Mark the recorded state, title and content, as handed to the
+        store. Returns its digest, for compact()."""
+        digest = state_digest(title, content)
+        if self._fd is not None:
+            os.write(self._fd, _dump({'checkpoint': digest}))
+        self._head.append(digest)
+        return digest
+
+    def compact(self, digest):
+        """Start over once the state of checkpoint digest is committed,
+        unless edits were recorded after it."""
+        if digest in self._head:
+            self.discard()
+            self._head = [digest]
+
+    def discard(self):
+        """Delete the journal; for when everything in it is committed."""
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+
+def recover_journals(store, directory=None):
+    """Apply the journals left by a crash to their notes and delete them.
+
+    Returns the ids of the notes that were updated. A journal that
+    cannot be applied, e.g. because a record is malformed, is logged and
+    left in place.
+    """
+    directory = directory or journal_dir()
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+
+    recovered = []
+    for name in names:
+        if not name.endswith(_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        note_id = name[:-len(_SUFFIX)]
+        try:
+            note = store.get_note(note_id)
+            if note is not None:
+                with open(path, 'rb') as f:
+                    records = _load_records(f)
+                replayed = _replay(records, note.title, note.content)
+                if replayed is None:
+                    logger.warning('Journal of note %s does not match it; '
+                                   'dropping it', note_id)
+                elif store.update_note(note_id, title=replayed[0],
+                                       content=replayed[1]):
+                    recovered.append(note_id)
+            store.flush()
+        except Exception:
+            # Keep it for a later look rather than fail every startup
+            logger.exception('Cannot recover the journal of note %s; '
+                             'leaving it in place', note_id)
+            continue
+        os.unlink(path)
+
+    if recovered:
+        logger.info('Recovered unsaved edits of %d notes', len(recovered))
+    return recovered
+
+
+def _replay(records, title, content):
+    """Return (title, content) with the records after the checkpoint of
+    this state applied, or None if no checkpoint matches it."""
+    digest = state_digest(title, content)
+    start = None
+    for i, record in enumerate(records):
+        if record.get('checkpoint') == digest:
+            start = i
+    if start is None:
+        return None
+    if start == len(records) - 1:
+        return title, content
+
+    blocks = parse_document(content).blocks
+    for record in records[start + 1:]:
+        title = record.get('title', title)
+        if 'line' in record:
+            line = record['line']
+            blocks[line:line + record['remove']] = [
+                _decode_block(block) for block in record['blocks']
+            ]
+    return title, serialize_document(Document(blocks))
+
+
+def _load_records(f):
+    records = []
+    for line in f:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break  # torn by the crash mid-write
+    return records
+
+
+def _splice(old, new):
+    """Return (line, lines removed, blocks inserted) turning old into
+    new, or None if they are the same."""
+    n = min(len(old), len(new))
+    start = 0
+    while start < n and (old[start] is new[start] or old[start] == new[start]):
+        start += 1
+    if start == len(old) == len(new):
+        return None
+    end = 0
+    while end < n - start and (old[-1 - end] is new[-1 - end]
+                               or old[-1 - end] == new[-1 - end]):
+        end += 1
+    return start, len(old) - start - end, new[start:len(new) - end]
+
+
+def _encode_block(block):
+    return [block.type, [[run.text, run.tags] for run in block.runs]]
+
+
+def _decode_block(data):
+    block_type, runs = data
+    return Block(block_type, [Run(text, tags) for text, tags in runs])
+
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
@@ -1,13 +1,15 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import time
+
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
 from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
 
-from betternotes.constants import APP_ID
-from betternotes.note_card import NoteCard
+from betternotes.constants import APP_ID, NOTES_PAGE_SIZE
+from betternotes.note_grid import NoteGrid
 
 
 class MainWindow(Adw.ApplicationWindow):
@@ -20,6 +22,18 @@ class MainWindow(Adw.ApplicationWindow):
         self._showing_trash = False
         self._search_timeout_id = None
 
+        # Keyset pagination state: continuation cursor and loaded count
+        self._notes_cursor = None
+        self._notes_loaded = 0
+        self._trash_cursor = None
+        self._trash_loaded = 0
+        self._notes_generation = 0
+        self._trash_generation = 0
+
+        # Views waiting for a refresh on the next frame
+        self._dirty_views = set()
+        self._refresh_tick_id = None
+
         # Selection mode state
         self._selection_mode = False
         self._selected_ids = set()
@@ -31,8 +45,7 @@ class MainWindow(Adw.ApplicationWindow):
         self._build_ui()
         self._connect_signals()
         self._setup_key_controller()
-        self._refresh_notes()
-        self._refresh_tags()
+        self._queue_refresh('notes', 'tags', 'trash')
 
     def _build_ui(self):
         # Main layout
@@ -117,15 +130,14 @@ class MainWindow(Adw.ApplicationWindow):
 
         # Notes grid
         notes_scroll = Gtk.ScrolledWindow(vexpand=True)
-        self._notes_grid = Gtk.FlowBox(
-            selection_mode=Gtk.SelectionMode.NONE,
-            homogeneous=False,
-            max_children_per_line=6,
-            min_children_per_line=2,
-            row_spacing=8,
-            column_spacing=8,
+        notes_scroll.connect('edge-reached', self._on_notes_edge_reached)
+        notes_scroll.get_vadjustment().connect(
+            'changed', self._on_scroll_extent_changed, self._load_more_notes,
         )
-        self._notes_grid.add_css_class('notes-grid')
+        self._notes_grid = NoteGrid()
+        self._notes_grid.connect('activated', self._on_card_activated_or_select)
+        self._notes_grid.connect('long-pressed', self._on_card_long_pressed)
+        self._notes_grid.connect('trash-requested', self._on_note_trash_requested)
         self._notes_grid.set_margin_start(12)
         self._notes_grid.set_margin_end(12)
         self._notes_grid.set_margin_top(8)
@@ -168,14 +180,15 @@ class MainWindow(Adw.ApplicationWindow):
 
         # Trash grid
         trash_scroll = Gtk.ScrolledWindow(vexpand=True)
-        self._trash_grid = Gtk.FlowBox(
-            selection_mode=Gtk.SelectionMode.NONE,
-            homogeneous=False,
-            max_children_per_line=6,
-            min_children_per_line=2,
-            row_spacing=8,
-            column_spacing=8,
+        trash_scroll.connect('edge-reached', self._on_trash_edge_reached)
+        trash_scroll.get_vadjustment().connect(
+            'changed', self._on_scroll_extent_changed, self._load_more_trash,
         )
+        self._trash_grid = NoteGrid(is_trash=True)
+        self._trash_grid.connect('activated', self._on_card_activated_or_select)
+        self._trash_grid.connect('long-pressed', self._on_card_long_pressed)
+        self._trash_grid.connect('restore-requested', self._on_note_restore_requested)
+        self._trash_grid.connect('delete-requested', self._on_note_delete_requested)
         self._trash_grid.set_margin_start(12)
         self._trash_grid.set_margin_end(12)
         self._trash_grid.set_margin_top(8)
@@ -278,16 +291,75 @@ class MainWindow(Adw.ApplicationWindow):
         return False
 
     def _connect_signals(self):
-        self._app.connect('note-changed', self._on_note_signal)
-        self._app.connect('note-created', self._on_note_signal)
-        self._app.connect('note-trashed', self._on_note_signal)
-        self._app.connect('note-restored', self._on_note_signal)
-        self._app.connect('note-deleted', self._on_note_signal)
+        self._app.connect('notes-changed', self._on_notes_changed)
+
+    def _on_notes_changed(self, app, events):
+        """Apply a batch of store ChangeEvents, touching only the views
+        and cards they affect."""
+        changed = {}
+        for event in events:
+            changed.setdefault(event.kind, set()).update(event.note_ids)
+        kinds = changed.keys()
+        gone = changed.get('trashed', set()) | changed.get('deleted', set())
+
+        # Notes view. Targeted updates only pay off while it is on screen
+        # and no full refresh is pending anyway.
+        # Any write can reorder search results and void the page cursor.
+        if (kinds & {'created', 'restored', 'tagged'}
+                or ('updated' in kinds and self._current_tag_filter)
+                or (self._search_query
+                    and kinds & {'updated', 'trashed', 'deleted'})
+                or (kinds & {'updated', 'trashed', 'deleted'}
+                    and (self._showing_trash or 'notes' in self._dirty_views))):
+            self._queue_refresh('notes')
+        else:
+            if gone:
+                self._remove_from_grid(self._notes_grid, gone)
+                self._notes_loaded = len(self._notes_grid.note_ids)
+                if not self._notes_loaded:
+                    self._queue_refresh('notes')
+            if 'updated' in kinds:
+                # Updated notes move to the front; fetch only those
+                generation = self._notes_generation
+                self._app.store.submit(
+                    'get_note_summaries', changed['updated'],
+                    callback=self._timed('notes_update', lambda notes: (
+                        self._on_updated_notes_loaded(notes, generation))),
+                )
+
+        # Trash view
+        tagged = changed.get('tagged', set())
+        left = changed.get('restored', set()) | changed.get('deleted', set())
+        if ('trashed' in kinds or tagged & self._trash_grid.note_ids
+                or (left and (not self._showing_trash
+                              or 'trash' in self._dirty_views))):
+            self._queue_refresh('trash')
+        elif left:
+            self._remove_from_grid(self._trash_grid, left)
+            self._trash_loaded = len(self._trash_grid.note_ids)
+            if not self._trash_loaded:
+                self._queue_refresh('trash')
+
+        if kinds & {'tagged', 'trashed', 'restored', 'deleted'}:
+            self._queue_refresh('tags')
+
+    def _remove_from_grid(self, grid, note_ids):
+        grid.remove_notes(note_ids)
+        if self._selection_mode and self._selected_ids & note_ids:
+            self._selected_ids -= note_ids
+            if not self._selected_ids:
+                self._exit_selection_mode()
+            else:
+                self._update_selection_visuals()
 
-    def _on_note_signal(self, app, note_id):
-        self._refresh_notes()
-        self._refresh_tags()
-        self._refresh_trash()
+    def _on_updated_notes_loaded(self, notes, generation):
+        if generation != self._notes_generation:
+            return
+        ids = {note.id for note in notes}
+        self._notes_grid.set_notes(
+            notes + [n for n in self._notes_grid.notes if n.id not in ids],
+        )
+        self._notes_loaded = len(self._notes_grid.note_ids)
 
     def _on_search_toggled(self, btn):
         active = btn.get_active()
@@ -297,7 +369,8 @@ class MainWindow(Adw.ApplicationWindow):
         else:
             self._search_query = ''
             self._search_entry.set_text('')
-            self._refresh_notes()
+            self._notes_loaded = 0
+            self._queue_refresh('notes')
 
     def _on_search_changed(self, entry):
         self._search_query = entry.get_text()
@@ -308,7 +381,8 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _do_search(self):
         self._search_timeout_id = None
-        self._refresh_notes()
+        self._notes_loaded = 0
+        self._queue_refresh('notes')
         return GLib.SOURCE_REMOVE
 
     def _on_view_changed(self, stack, pspec):
@@ -317,8 +391,9 @@ class MainWindow(Adw.ApplicationWindow):
         if self._selection_mode:
             self._exit_selection_mode()
         self._fab.set_visible(not is_trash)
-        if is_trash:
-            self._refresh_trash()
+        if self._dirty_views:
+            # Catch up on changes made while this view was hidden
+            self._queue_refresh()
 
     # --- Selection mode ---
 
@@ -360,16 +435,8 @@ class MainWindow(Adw.ApplicationWindow):
         self._fab.set_visible(not self._showing_trash)
 
         # Clear visual selection on all cards
-        self._clear_card_selection(self._notes_grid)
-        self._clear_card_selection(self._trash_grid)
-
-    def _clear_card_selection(self, grid):
-        child = grid.get_first_child()
-        while child:
-            card = child.get_child() if isinstance(child, Gtk.FlowBoxChild) else child
-            if isinstance(card, NoteCard):
-                card.selected = False
-            child = child.get_next_sibling()
+        self._notes_grid.set_selection(())
+        self._trash_grid.set_selection(())
 
     def _toggle_card_selection(self, note_id):
         if note_id in self._selected_ids:
@@ -385,12 +452,7 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _select_all(self):
         grid = self._trash_grid if self._showing_trash else self._notes_grid
-        child = grid.get_first_child()
-        while child:
-            card = child.get_child() if isinstance(child, Gtk.FlowBoxChild) else child
-            if isinstance(card, NoteCard):
-                self._selected_ids.add(card.note_id)
-            child = child.get_next_sibling()
+        self._selected_ids.update(grid.note_ids)
         self._update_selection_visuals()
 
     def _update_selection_visuals(self):
@@ -406,12 +468,7 @@ class MainWindow(Adw.ApplicationWindow):
 
         # Update card visuals in the active grid
         grid = self._trash_grid if self._showing_trash else self._notes_grid
-        child = grid.get_first_child()
-        while child:
-            card = child.get_child() if isinstance(child, Gtk.FlowBoxChild) else child
-            if isinstance(card, NoteCard):
-                card.selected = card.note_id in self._selected_ids
-            child = child.get_next_sibling()
+        grid.set_selection(self._selected_ids)
 
     def _on_card_activated_or_select(self, card, note_id):
         """Handle click on a card — open note normally, or toggle selection in selection mode."""
@@ -441,11 +498,10 @@ class MainWindow(Adw.ApplicationWindow):
         ids = set(self._selected_ids)
         if not ids:
             return
-        self._app.store.trash_notes(ids)
+        self._app.store.submit('trash_notes', ids)
         for note_id in ids:
             self._app.close_note_window(note_id)
         self._exit_selection_mode()
-        self._app.emit('note-trashed', '')
         count = len(ids)
         self._show_toast(
             f'{count} note{"s" if count != 1 else ""} moved to trash',
@@ -453,16 +509,14 @@ class MainWindow(Adw.ApplicationWindow):
         )
 
     def _undo_bulk_trash(self, note_ids):
-        self._app.store.restore_notes(note_ids)
-        self._app.emit('note-restored', '')
+        self._app.store.submit('restore_notes', note_ids)
 
     def _on_bulk_restore(self, btn):
         ids = set(self._selected_ids)
         if not ids:
             return
-        self._app.store.restore_notes(ids)
+        self._app.store.submit('restore_notes', ids)
         self._exit_selection_mode()
-        self._app.emit('note-restored', '')
         count = len(ids)
         self._show_toast(f'{count} note{"s" if count != 1 else ""} restored')
 
@@ -483,45 +537,80 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _on_bulk_delete_confirmed(self, dialog, response, note_ids):
         if response == 'delete':
-            self._app.store.delete_notes(note_ids)
+            self._app.store.submit('delete_notes', note_ids)
             self._exit_selection_mode()
-            self._app.emit('note-deleted', '')
             count = len(note_ids)
             self._show_toast(f'{count} note{"s" if count != 1 else ""} permanently deleted')
 
+    # --- Refresh scheduling ---
+    #
+    # Requests only mark views dirty. A frame-clock tick then refreshes
+    # each dirty view that is on screen, so any number of requests in one
+    # frame cost at most one refresh per view. Hidden views stay dirty
+    # until they are shown.
+
+    def _queue_refresh(self, *views):
+        self._dirty_views.update(views)
+        if self._refresh_tick_id is None:
+            self._refresh_tick_id = self.add_tick_callback(self._on_refresh_tick)
+
+    def _on_refresh_tick(self, widget, frame_clock):
+        self._refresh_tick_id = None
+        visible = {'trash'} if self._showing_trash else {'notes', 'tags'}
+        due = self._dirty_views & visible
+        self._dirty_views -= due
+        if 'notes' in due:
+            self._refresh_notes()
+        if 'tags' in due:
+            self._refresh_tags()
+        if 'trash' in due:
+            self._refresh_trash()
+        return GLib.SOURCE_REMOVE
+
+    def _timed(self, view, callback):
+        """Wrap the callback applying a refresh's result so the profiler,
+        if on, records the refresh from request to applied result."""
+        profiler = self._app.profiler
+        if profiler is None:
+            return callback
+        start = time.perf_counter()
+
+        def done(*args):
+            try:
+                callback(*args)
+            finally:
+                profiler.add_refresh(view, time.perf_counter() - start)
+        return done
+
     # --- Refresh ---
+    #
+    # Queries run on the store's database thread. Each refresh bumps a
+    # generation counter so results of a superseded request are dropped.
 
     def _refresh_notes(self):
-        # Clear grid
-        child = self._notes_grid.get_first_child()
-        while child:
-            next_child = child.get_next_sibling()
-            self._notes_grid.remove(child)
-            child = next_child
+        self._notes_generation += 1
+        # Reload at least as many notes as were showing so the scroll
+        # position survives a refresh.
+        limit = max(NOTES_PAGE_SIZE, self._notes_loaded)
+        self._fetch_notes_page(
+            None, limit, self._timed('notes', self._on_notes_loaded),
+            self._notes_generation,
+        )
 
-        # Get notes
-        if self._search_query:
-            notes = self._app.store.search_notes(self._search_query)
-        elif self._current_tag_filter:
-            notes = self._app.store.get_notes_by_tag(self._current_tag_filter)
-        else:
-            notes = self._app.store.get_all_notes()
+    def _on_notes_loaded(self, page, generation):
+        if generation != self._notes_generation:
+            return
+
+        self._notes_cursor = page.next_cursor
+        self._notes_loaded = len(page.notes)
+        self._notes_grid.set_notes(page.notes)
 
-        if not notes:
+        if not page.notes:
             self._notes_stack.set_visible_child_name('empty')
             return
 
         self._notes_stack.set_visible_child_name('grid')
-        existing_ids = set()
-        for note in notes:
-            card = NoteCard(note)
-            card.connect('activated', self._on_card_activated_or_select)
-            card.connect('long-pressed', self._on_card_long_pressed)
-            card.connect('trash-requested', self._on_note_trash_requested)
-            if self._selection_mode and note.id in self._selected_ids:
-                card.selected = True
-            existing_ids.add(note.id)
-            self._notes_grid.append(card)
+        existing_ids = set(self._notes_grid.note_ids)
 
         # Prune selected_ids that no longer exist
         if self._selection_mode and not self._showing_trash:
@@ -531,32 +620,73 @@ class MainWindow(Adw.ApplicationWindow):
             else:
                 self._update_selection_visuals()
 
+    def _fetch_notes_page(self, cursor, limit, callback, generation):
+        store = self._app.store
+        done = lambda page: callback(page, generation)
+        if self._search_query:
+            store.submit(
+                'search_notes_page', self._search_query, cursor, limit,
+                callback=done,
+            )
+        else:
+            store.submit(
+                'get_notes_page', cursor, limit,
+                tag_name=self._current_tag_filter, callback=done,
+            )
+
+    def _on_scroll_extent_changed(self, adjustment, load_more):
+        # Pages too short to scroll never reach the edge; keep loading
+        # until the viewport is filled.
+        page_size = adjustment.get_page_size()
+        if page_size > 0 and adjustment.get_upper() <= page_size:
+            load_more()
+
+    def _on_notes_edge_reached(self, scrolled, pos):
+        if pos == Gtk.PositionType.BOTTOM:
+            self._load_more_notes()
+
+    def _load_more_notes(self):
+        if self._notes_cursor is None:
+            return
+        cursor, self._notes_cursor = self._notes_cursor, None
+        self._fetch_notes_page(
+            cursor, NOTES_PAGE_SIZE, self._on_more_notes_loaded,
+            self._notes_generation,
+        )
+
+    def _on_more_notes_loaded(self, page, generation):
+        if generation != self._notes_generation:
+            return
+        self._notes_cursor = page.next_cursor
+        self._notes_loaded += len(page.notes)
+        self._notes_grid.append_notes(page.notes)
+
     def _refresh_trash(self):
-        child = self._trash_grid.get_first_child()
-        while child:
-            next_child = child.get_next_sibling()
-            self._trash_grid.remove(child)
-            child = next_child
+        self._trash_generation += 1
+        limit = max(NOTES_PAGE_SIZE, self._trash_loaded)
+        generation = self._trash_generation
+        self._app.store.submit(
+            'get_trashed_notes_page', None, limit,
+            callback=self._timed(
+                'trash', lambda page: self._on_trash_loaded(page, generation)),
+        )
 
-        trashed = self._app.store.get_trashed_notes()
-        if not trashed:
+    def _on_trash_loaded(self, page, generation):
+        if generation != self._trash_generation:
+            return
+
+        self._trash_cursor = page.next_cursor
+        self._trash_loaded = len(page.notes)
+        self._trash_grid.set_notes(page.notes)
+
+        if not page.notes:
             self._trash_stack.set_visible_child_name('empty')
             self._trash_banner.set_visible(False)
             return
 
         self._trash_stack.set_visible_child_name('grid')
         self._trash_banner.set_visible(True)
-        existing_ids = set()
-        for note in trashed:
-            card = NoteCard(note, is_trash=True)
-            card.connect('activated', self._on_card_activated_or_select)
-            card.connect('long-pressed', self._on_card_long_pressed)
-            card.connect('restore-requested', self._on_note_restore_requested)
-            card.connect('delete-requested', self._on_note_delete_requested)
-            if self._selection_mode and note.id in self._selected_ids:
-                card.selected = True
-            existing_ids.add(note.id)
-            self._trash_grid.append(card)
+        existing_ids = set(self._trash_grid.note_ids)
 
         # Prune selected_ids that no longer exist
         if self._selection_mode and self._showing_trash:
@@ -566,7 +696,33 @@ class MainWindow(Adw.ApplicationWindow):
             else:
                 self._update_selection_visuals()
 
+    def _on_trash_edge_reached(self, scrolled, pos):
+        if pos == Gtk.PositionType.BOTTOM:
+            self._load_more_trash()
+
+    def _load_more_trash(self):
+        if self._trash_cursor is None:
+            return
+        cursor, self._trash_cursor = self._trash_cursor, None
+        generation = self._trash_generation
+        self._app.store.submit(
+            'get_trashed_notes_page', cursor,
+            callback=lambda page: self._on_more_trash_loaded(page, generation),
+        )
+
+    def _on_more_trash_loaded(self, page, generation):
+        if generation != self._trash_generation:
+            return
+        self._trash_cursor = page.next_cursor
+        self._trash_loaded += len(page.notes)
+        self._trash_grid.append_notes(page.notes)
+
     def _refresh_tags(self):
+        self._app.store.submit(
+            'get_all_tags', callback=self._timed('tags', self._on_tags_loaded),
+        )
+
+    def _on_tags_loaded(self, tags):
         # Clear tag bar
         child = self._tag_bar.get_first_child()
         while child:
@@ -574,7 +730,6 @@ class MainWindow(Adw.ApplicationWindow):
             self._tag_bar.remove(child)
             child = next_child
 
-        tags = self._app.store.get_all_tags()
         if not tags:
             self._tag_scroll.set_visible(False)
             return
@@ -611,7 +766,8 @@ class MainWindow(Adw.ApplicationWindow):
             if isinstance(child, Gtk.ToggleButton) and child != btn:
                 child.set_active(False)
             child = child.get_next_sibling()
-        self._refresh_notes()
+        self._notes_loaded = 0
+        self._queue_refresh('notes')
 
     def _on_tag_right_click(self, gesture, n_press, x, y, tag_name, btn):
         popover = Gtk.Popover()
@@ -638,24 +794,23 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _on_delete_tag_confirmed(self, dialog, response, tag_name):
         if response == 'delete':
-            self._app.store.delete_tag(tag_name)
             if self._current_tag_filter == tag_name:
                 self._current_tag_filter = None
-            self._refresh_tags()
-            self._refresh_notes()
+            self._app.store.submit('delete_tag', tag_name)
+            # Deleting a tag no note carries publishes no event, and the
+            # filter may have been cleared
+            self._queue_refresh('tags', 'notes')
 
     def _on_note_activated(self, card, note_id):
         self._app.open_note(note_id)
 
     def _on_note_trash_requested(self, card, note_id):
-        self._app.store.trash_note(note_id)
         self._app.close_note_window(note_id)
-        self._app.emit('note-trashed', note_id)
+        self._app.store.submit('trash_note', note_id)
         self._show_toast('Note moved to trash', 'Undo', self._undo_trash, note_id)
 
     def _on_note_restore_requested(self, card, note_id):
-        self._app.store.restore_note(note_id)
-        self._app.emit('note-restored', note_id)
+        self._app.store.submit('restore_note', note_id)
         self._show_toast('Note restored')
 
     def _on_note_delete_requested(self, card, note_id):
@@ -671,8 +826,7 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _on_delete_confirmed(self, dialog, response, note_id):
         if response == 'delete':
-            self._app.store.delete_note(note_id)
-            self._app.emit('note-deleted', note_id)
+            self._app.store.submit('delete_note', note_id)
 
     def _on_empty_trash(self, btn):
         dialog = Adw.AlertDialog(
@@ -687,12 +841,10 @@ class MainWindow(Adw.ApplicationWindow):
 
     def _on_empty_trash_confirmed(self, dialog, response):
         if response == 'empty':
-            self._app.store.empty_trash()
-            self._refresh_trash()
+            self._app.store.submit('empty_trash')
 
     def _undo_trash(self, note_id):
-        self._app.store.restore_note(note_id)
-        self._app.emit('note-restored', note_id)
+        self._app.store.submit('restore_note', note_id)
 
     def _show_toast(self, message, button_label=None, callback=None, callback_data=None):
         toast = Adw.Toast(title=message, timeout=5)
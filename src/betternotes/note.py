@@ -4,6 +4,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
+from betternotes.rich_text import get_plain_text, make_preview
+
 
 @dataclass
 class Note:
@@ -15,6 +17,7 @@ class Note:
     updated_at: str
     trashed_at: Optional[str] = None
     tags: list[str] = field(default_factory=list)
+    preview: Optional[str] = None  # precomputed by NoteStore
 
     @property
     def is_trashed(self) -> bool:
@@ -22,19 +25,34 @@ class Note:
 
     @property
     def preview_text(self) -> str:
-        """Extract plain text preview from rich-text JSON content."""
-        if not self.content:
-            return ''
-        try:
-            import json
-            data = json.loads(self.content)
-            lines = []
-            for block in data.get('blocks', []):
-                text = ''.join(run.get('text', '') for run in block.get('runs', []))
-                lines.append(text)
-            return '\n'.join(lines)[:200]
-        except (json.JSONDecodeError, TypeError, KeyError):
-            return self.content[:200]
+        """Plain text preview, as stored or derived from the content."""
+        if self.preview is not None:
+            return self.preview
+        return make_preview(get_plain_text(self.content))
+
+
+@dataclass(slots=True)
+class NoteSummary:
+    """What list views show of a note: everything but the content.
+
+    Slotted to keep large listings compact; open the note with
+    NoteStore.get_note() for the full Note.
+    """
+    id: str
+    title: str
+    color: str
+    updated_at: str
+    preview: str
+    trashed_at: Optional[str] = None
+    tags: list[str] = field(default_factory=list)
+
+    @property
+    def is_trashed(self) -> bool:
+        return self.trashed_at is not None
+
+    @property
+    def preview_text(self) -> str:
+        return self.preview
 
 
 @dataclass
@@ -42,3 +60,22 @@ class Tag:
     id: str
     name: str
     note_count: int = 0
+
+
+@dataclass
+class NotePage:
+    """One page of a keyset-paginated note listing."""
+    notes: list[NoteSummary]
+    next_cursor: Optional[str] = None  # opaque; None when exhausted
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """A change published by NoteStore after a write.
+
+    kind is one of 'created', 'updated', 'trashed', 'restored', 'deleted'
+    or 'tagged'; fields names the note columns an update changed.
+    """
+    kind: str
+    note_ids: frozenset[str]
+    fields: frozenset[str] = frozenset()
@@ -4,7 +4,7 @@ import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
-from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
+from gi.repository import Adw, GLib, Gtk
 
 CARD_SIZE = 200
 PREVIEW_MAX_CHARS = 80
@@ -12,20 +12,16 @@ PREVIEW_MAX_LINES = 5
 
 
 class NoteCard(Gtk.Overlay):
-    """Fixed-size square card widget for displaying a note in the grid."""
+    """Fixed-size square card widget for displaying a note in the grid.
 
-    __gsignals__ = {
-        'activated': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'long-pressed': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'trash-requested': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'restore-requested': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-        'delete-requested': (GObject.SignalFlags.RUN_LAST, None, (str,)),
-    }
+    Cards are recycled by the grid: update() rebinds one to another note.
+    They handle no input themselves; NoteGrid owns the gestures and the
+    context menu for all of its cards.
+    """
 
-    def __init__(self, note, is_trash=False, **kwargs):
+    def __init__(self, note=None, **kwargs):
         super().__init__(**kwargs)
-        self._note = note
-        self._is_trash = is_trash
+        self._note = None
         self._selected = False
 
         # Fixed square size, don't stretch, clip overflow
@@ -38,7 +34,6 @@ class NoteCard(Gtk.Overlay):
         frame = Gtk.Frame()
         frame.set_overflow(Gtk.Overflow.HIDDEN)
         frame.add_css_class('note-card')
-        frame.add_css_class(f'note-color-{note.color}-card')
         self._frame = frame
 
         # Vertical layout inside the frame
@@ -53,73 +48,57 @@ class NoteCard(Gtk.Overlay):
         inner.add_css_class('note-card-content')
 
         # Title
-        title = note.title or 'Untitled Note'
-        title_label = Gtk.Label(
-            label=title,
+        self._title_label = Gtk.Label(
             xalign=0,
             ellipsize=3,  # END
             max_width_chars=22,
         )
-        title_label.add_css_class('note-card-title')
-        inner.append(title_label)
+        self._title_label.add_css_class('note-card-title')
+        inner.append(self._title_label)
 
         inner.append(Gtk.Separator())
 
-        # Preview text — hard-truncated in code
-        preview = note.preview_text
-        has_more = False
-        if preview:
-            lines = preview.split('\n')
-            if len(lines) > PREVIEW_MAX_LINES:
-                lines = lines[:PREVIEW_MAX_LINES]
-                has_more = True
-            truncated = '\n'.join(lines)
-            if len(truncated) > PREVIEW_MAX_CHARS:
-                truncated = truncated[:PREVIEW_MAX_CHARS]
-                has_more = True
-
-            preview_label = Gtk.Label(
-                label=truncated,
-                xalign=0,
-                yalign=0,
-                wrap=True,
-                wrap_mode=1,  # WORD_CHAR
-                max_width_chars=22,
-            )
-            preview_label.add_css_class('note-card-preview')
-            inner.append(preview_label)
+        # Preview text — hard-truncated in update()
+        self._preview_label = Gtk.Label(
+            xalign=0,
+            yalign=0,
+            wrap=True,
+            wrap_mode=1,  # WORD_CHAR
+            max_width_chars=22,
+        )
+        self._preview_label.add_css_class('note-card-preview')
+        inner.append(self._preview_label)
 
         # Tags
-        if note.tags:
-            spacer = Gtk.Box(vexpand=True)
-            inner.append(spacer)
-            tags_label = Gtk.Label(
-                label=', '.join(note.tags),
-                xalign=0,
-                ellipsize=3,
-                max_width_chars=22,
-            )
-            tags_label.add_css_class('note-card-tags')
-            inner.append(tags_label)
+        self._tags_spacer = Gtk.Box(vexpand=True)
+        inner.append(self._tags_spacer)
+        self._tags_label = Gtk.Label(
+            xalign=0,
+            ellipsize=3,
+            max_width_chars=22,
+        )
+        self._tags_label.add_css_class('note-card-tags')
+        inner.append(self._tags_label)
 
         outer.append(inner)
 
         # "More" indicator bar when content was truncated
-        if has_more:
-            more_bar = Gtk.Box(hexpand=True)
-            more_bar.add_css_class('note-card-more')
-            more_bar.add_css_class(f'note-card-more-{note.color}')
+        self._more_bar = Gtk.Box(hexpand=True)
+        self._more_bar.add_css_class('note-card-more')
 
-            dots = Gtk.Label(label='\u2026', xalign=0.5)  # ellipsis char
-            dots.add_css_class('note-card-more-label')
-            dots.set_hexpand(True)
-            more_bar.append(dots)
+        dots = Gtk.Label(label='\u2026', xalign=0.5)  # ellipsis char
+        dots.add_css_class('note-card-more-label')
+        dots.set_hexpand(True)
+        self._more_bar.append(dots)
 
-            outer.append(more_bar)
+        outer.append(self._more_bar)
 
         frame.set_child(outer)
         self.set_child(frame)
 
+        if note is not None:
+            self.update(note)
+
         # Checkmark overlay (top-right corner, hidden by default)
         self._check = Gtk.Image.new_from_icon_name('object-select-symbolic')
         self._check.add_css_class('note-card-check')
@@ -130,72 +109,47 @@ class NoteCard(Gtk.Overlay):
         self._check.set_visible(False)
         self.add_overlay(self._check)
 
-        # Click gesture
-        click = Gtk.GestureClick()
-        click.connect('released', self._on_click)
-        self.add_controller(click)
-
-        # Long-press gesture
-        long_press = Gtk.GestureLongPress()
-        long_press.set_delay_factor(1.0)  # default ~600ms
-        long_press.connect('pressed', self._on_long_press)
-        self.add_controller(long_press)
-
-        self._setup_context_menu()
-
-    def _on_click(self, gesture, n_press, x, y):
-        if n_press == 1:
-            self.emit('activated', self._note.id)
+    def update(self, note):
+        """Show note, touching only the parts that differ from the
+        currently displayed one."""
+        old = self._note
+        self._note = note
 
-    def _on_long_press(self, gesture, x, y):
-        self.emit('long-pressed', self._note.id)
+        if old is None or old.color != note.color:
+            if old is not None:
+                self._frame.remove_css_class(f'note-color-{old.color}-card')
+                self._more_bar.remove_css_class(f'note-card-more-{old.color}')
+            self._frame.add_css_class(f'note-color-{note.color}-card')
+            self._more_bar.add_css_class(f'note-card-more-{note.color}')
 
-    def _setup_context_menu(self):
-        menu = Gio.Menu()
-        if self._is_trash:
-            menu.append('Restore', 'card.restore')
-            menu.append('Delete Permanently', 'card.delete')
-        else:
-            menu.append('Open', 'card.open')
-            menu.append('Move to Trash', 'card.trash')
+        if old is None or old.title != note.title:
+            self._title_label.set_label(note.title or 'Untitled Note')
 
-        action_group = Gio.SimpleActionGroup()
-
-        if self._is_trash:
-            restore_action = Gio.SimpleAction.new('restore', None)
-            restore_action.connect('activate', lambda *a: self.emit('restore-requested', self._note.id))
-            action_group.add_action(restore_action)
+        preview = note.preview_text
+        if old is None or old.preview_text != preview:
+            has_more = False
+            truncated = ''
+            if preview:
+                lines = preview.split('\n')
+                if len(lines) > PREVIEW_MAX_LINES:
+                    lines = lines[:PREVIEW_MAX_LINES]
+                    has_more = True
+                truncated = '\n'.join(lines)
+                if len(truncated) > PREVIEW_MAX_CHARS:
+                    truncated = truncated[:PREVIEW_MAX_CHARS]
+                    has_more = True
+            self._preview_label.set_label(truncated)
+            self._preview_label.set_visible(bool(preview))
+            self._more_bar.set_visible(has_more)
+
+        if old is None or old.tags != note.tags:
+            self._tags_label.set_label(', '.join(note.tags))
+            self._tags_spacer.set_visible(bool(note.tags))
+            self._tags_label.set_visible(bool(note.tags))
 
-            delete_action = Gio.SimpleAction.new('delete', None)
-            delete_action.connect('activate', lambda *a: self.emit('delete-requested', self._note.id))
-            action_group.add_action(delete_action)
-        else:
-            open_action = Gio.SimpleAction.new('open', None)
-            open_action.connect('activate', lambda *a: self.emit('activated', self._note.id))
-            action_group.add_action(open_action)
-
-            trash_action = Gio.SimpleAction.new('trash', None)
-            trash_action.connect('activate', lambda *a: self.emit('trash-requested', self._note.id))
-            action_group.add_action(trash_action)
-
-        self.insert_action_group('card', action_group)
-
-        popover = Gtk.PopoverMenu(menu_model=menu)
-        popover.set_parent(self)
-        popover.set_has_arrow(False)
-
-        right_click = Gtk.GestureClick(button=Gdk.BUTTON_SECONDARY)
-        right_click.connect('released', self._on_right_click, popover)
-        self.add_controller(right_click)
-
-    def _on_right_click(self, gesture, n_press, x, y, popover):
-        rect = Gdk.Rectangle()
-        rect.x = int(x)
-        rect.y = int(y)
-        rect.width = 1
-        rect.height = 1
-        popover.set_pointing_to(rect)
-        popover.popup()
+    @property
+    def note(self):
+        return self._note
 
     @property
     def note_id(self):
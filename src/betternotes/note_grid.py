@@ -0,0 +1,232 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import gi
+gi.require_version('Gtk', '4.0')
+
+from gi.repository import Gdk, Gio, GLib, GObject, Gtk
+
+from betternotes.note_card import NoteCard
+
+_CARD_SIGNALS = (
+    'activated', 'long-pressed', 'trash-requested',
+    'restore-requested', 'delete-requested',
+)
+
+# Context menu entries: (label, action name, signal emitted)
+_NOTE_MENU = (
+    ('Open', 'open', 'activated'),
+    ('Move to Trash', 'trash', 'trash-requested'),
+)
+_TRASH_MENU = (
+    ('Restore', 'restore', 'restore-requested'),
+    ('Delete Permanently', 'delete', 'delete-requested'),
+)
+
+
+class NoteItem(GObject.Object):
+    """List model item holding the note shown in one grid cell."""
+
+    __gtype_name__ = 'BetterNotesNoteItem'
+
+    note = GObject.Property(type=object)
+
+    def __init__(self, note):
+        super().__init__()
+        self.note = note
+
+
+class NoteGrid(Gtk.GridView):
+    """Recycling grid of note cards backed by a Gio.ListStore.
+
+    Only cards for visible cells exist; the factory binds them to the
+    NoteItem of the cell they currently show and unbinds them when they
+    scroll out of view. Cards are display-only: the grid owns the click,
+    long-press and right-click gestures and one context menu for all
+    cards, and emits the card signals with the note id under the pointer.
+    """
+
+    __gsignals__ = {
+        name: (GObject.SignalFlags.RUN_LAST, None, (str,))
+        for name in _CARD_SIGNALS
+    }
+
+    def __init__(self, is_trash=False, **kwargs):
+        self._is_trash = is_trash
+        self._store = Gio.ListStore(item_type=NoteItem)
+        self._items = {}     # note id -> NoteItem, in model order
+        self._bound = {}     # NoteCard -> (NoteItem, notify handler id)
+        self._selected_ids = frozenset()
+        self._menu = None
+        self._popover = None
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_setup)
+        factory.connect('bind', self._on_bind)
+        factory.connect('unbind', self._on_unbind)
+
+        super().__init__(
+            model=Gtk.NoSelection(model=self._store),
+            factory=factory,
+            max_columns=6,
+            min_columns=2,
+            **kwargs,
+        )
+        self.add_css_class('notes-grid')
+
+        click = Gtk.GestureClick()
+        click.connect('released', self._on_click)
+        self.add_controller(click)
+
+        long_press = Gtk.GestureLongPress()
+        long_press.set_delay_factor(1.0)  # default ~600ms
+        long_press.connect('pressed', self._on_long_press)
+        self.add_controller(long_press)
+
+        right_click = Gtk.GestureClick(button=Gdk.BUTTON_SECONDARY)
+        right_click.connect('released', self._on_right_click)
+        self.add_controller(right_click)
+
+    # --- Model ---
+
+    def set_notes(self, notes):
+        """Show exactly notes, in order.
+
+        Items are matched by note id. A changed note updates its item in
+        place, which rebinds only that card; the model is spliced over
+        the smallest range whose ids differ.
+        """
+        old_ids = list(self._items)
+        items = {}
+        for note in notes:
+            item = self._items.get(note.id)
+            if item is None:
+                item = NoteItem(note)
+            elif item.note != note:
+                item.note = note
+            items[note.id] = item
+        new_ids = list(items)
+        self._items = items
+
+        start = 0
+        common = min(len(old_ids), len(new_ids))
+        while start < common and old_ids[start] == new_ids[start]:
+            start += 1
+        suffix = 0
+        while (suffix < len(old_ids) - start and suffix < len(new_ids) - start
+               and old_ids[-1 - suffix] == new_ids[-1 - suffix]):
+            suffix += 1
+        removed = len(old_ids) - start - suffix
+        added = [items[i] for i in new_ids[start:len(new_ids) - suffix]]
+        if removed or added:
+            self._store.splice(start, removed, added)
+
+    def append_notes(self, notes):
+        """Add notes not already shown to the end of the grid."""
+        added = []
+        for note in notes:
+            if note.id not in self._items:
+                item = NoteItem(note)
+                self._items[note.id] = item
+                added.append(item)
+        if added:
+            self._store.splice(self._store.get_n_items(), 0, added)
+
+    def remove_notes(self, note_ids):
+        """Drop the given notes from the grid, if shown."""
+        if not any(note_id in self._items for note_id in note_ids):
+            return
+        self.set_notes([
+            item.note for note_id, item in self._items.items()
+            if note_id not in note_ids
+        ])
+
+    @property
+    def notes(self):
+        return [item.note for item in self._items.values()]
+
+    @property
+    def note_ids(self):
+        return self._items.keys()
+
+    def set_selection(self, note_ids):
+        """Mark the cards of note_ids as selected."""
+        self._selected_ids = frozenset(note_ids)
+        for card in self._bound:
+            card.selected = card.note_id in self._selected_ids
+
+    # --- Factory ---
+
+    def _on_setup(self, factory, list_item):
+        # Input is handled by the grid's own gestures
+        list_item.set_activatable(False)
+        list_item.set_child(NoteCard())
+
+    def _on_bind(self, factory, list_item):
+        card = list_item.get_child()
+        item = list_item.get_item()
+        card.update(item.note)
+        card.selected = item.note.id in self._selected_ids
+        handler = item.connect('notify::note', lambda i, p: card.update(i.note))
+        self._bound[card] = (item, handler)
+
+    def _on_unbind(self, factory, list_item):
+        item, handler = self._bound.pop(list_item.get_child())
+        item.disconnect(handler)
+
+    # --- Input ---
+
+    def _note_id_at(self, x, y):
+        widget = self.pick(x, y, Gtk.PickFlags.DEFAULT)
+        while widget is not None and widget is not self:
+            if isinstance(widget, NoteCard):
+                return widget.note_id if widget.note else None
+            widget = widget.get_parent()
+        return None
+
+    def _on_click(self, gesture, n_press, x, y):
+        note_id = self._note_id_at(x, y)
+        if n_press == 1 and note_id:
+            self.emit('activated', note_id)
+
+    def _on_long_press(self, gesture, x, y):
+        note_id = self._note_id_at(x, y)
+        if note_id:
+            self.emit('long-pressed', note_id)
+
+    def _on_right_click(self, gesture, n_press, x, y):
+        note_id = self._note_id_at(x, y)
+        if not note_id:
+            return
+        entries = _TRASH_MENU if self._is_trash else _NOTE_MENU
+        if self._popover is None:
+            # Built on first use, like the popover, as most grids never show it
+            actions = Gio.SimpleActionGroup()
+            for label, name, signal in entries:
+                action = Gio.SimpleAction.new(name, GLib.VariantType.new('s'))
+                action.connect('activate', self._on_menu_action, signal)
+                actions.add_action(action)
+            self.insert_action_group('card', actions)
+            self._menu = Gio.Menu()
+            self._popover = Gtk.PopoverMenu(menu_model=self._menu)
+            self._popover.set_parent(self)
+            self._popover.set_has_arrow(False)
+
+        # Point the shared menu's actions at this note
+        self._menu.remove_all()
+        for label, name, signal in entries:
+            item = Gio.MenuItem.new(label, None)
+            item.set_action_and_target_value(
+                f'card.{name}', GLib.Variant('s', note_id),
+            )
+            self._menu.append_item(item)
+
+        rect = Gdk.Rectangle()
+        rect.x = int(x)
+        rect.y = int(y)
+        rect.width = 1
+        rect.height = 1
+        self._popover.set_pointing_to(rect)
+        self._popover.popup()
+
+    def _on_menu_action(self, action, param, signal):
+        self.emit(signal, param.get_string())
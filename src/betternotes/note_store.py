@@ -1,291 +1,926 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import functools
+import json
+import logging
 import os
+import queue
 import sqlite3
+import threading
 import uuid
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from urllib.request import pathname2url
 
 from gi.repository import GLib
 
-from betternotes.note import Note, Tag
-from betternotes.constants import TRASH_RETENTION_DAYS
+from betternotes.note import ChangeEvent, Note, NotePage, NoteSummary, Tag
+from betternotes.rich_text import get_plain_text, make_preview
+from betternotes.constants import (
+    CONTENT_COMPRESS_MIN_BYTES,
+    DEFAULT_DURABILITY,
+    NOTES_PAGE_SIZE,
+    READ_POOL_SIZE,
+    TRASH_RETENTION_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds).
+_MAX_SQL_VARIABLES = 900
+
+# Columns list views need; content is only loaded by get_note().
+_SUMMARY_COLUMNS = 'n.id, n.title, n.color, n.updated_at, n.trashed_at, n.preview'
+
+# Compressed content is stored as a BLOB of this marker followed by the
+# zlib stream of the UTF-8 text; everything else is stored as plain TEXT.
+_COMPRESSED_MARKER = b'zlib:'
+# Fastest level: autosaves recompress the whole note, and on long pasted
+# text level 6 takes twice as long for output only ~8% smaller.
+_COMPRESS_LEVEL = 1
+
+# Durability profile -> PRAGMA synchronous. Under WAL, NORMAL only syncs
+# at checkpoints: a power loss may drop the last commits but never
+# corrupts the database. FULL syncs the WAL on every commit.
+DURABILITY_PROFILES = {
+    'full': 'FULL',
+    'normal': 'NORMAL',
+}
+
+# Public methods that only read; these may run on any thread concurrently
+# with writes and with each other.
+READ_METHODS = frozenset({
+    'get_note', 'get_note_summaries', 'get_all_notes', 'get_trashed_notes',
+    'get_notes_page', 'get_trashed_notes_page', 'search_notes',
+    'search_notes_page',
+    'get_all_tags', 'get_tags_for_note', 'get_tags_for_notes',
+    'get_notes_by_tag',
+})
+
+# Schema migrations: entry N upgrades a database at user_version N to
+# N + 1. Each step is an SQL statement or a callable taking the
+# connection; a migration and its version bump commit together.
+_MIGRATIONS = [
+    # 1: base schema. Databases created before versioning already have
+    # it, hence IF NOT EXISTS.
+    (
+        '''CREATE TABLE IF NOT EXISTS notes (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL DEFAULT '',
+            content TEXT NOT NULL DEFAULT '',
+            color TEXT NOT NULL DEFAULT 'yellow',
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            trashed_at TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS tags (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )''',
+        '''CREATE TABLE IF NOT EXISTS note_tags (
+            note_id TEXT NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+            tag_id TEXT NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+            PRIMARY KEY (note_id, tag_id)
+        )''',
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, content, content=notes, content_rowid=rowid
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts(rowid, title, content)
+            VALUES (new.rowid, new.title, new.content);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content)
+            VALUES ('delete', old.rowid, old.title, old.content);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content)
+            VALUES ('delete', old.rowid, old.title, old.content);
+            INSERT INTO notes_fts(rowid, title, content)
+            VALUES (new.rowid, new.title, new.content);
+        END''',
+    ),
+    # 2: indexes for the hot list queries.
+    (
+        # Main list and its keyset pagination
+        'CREATE INDEX idx_notes_list ON notes(trashed_at, updated_at, id)',
+        # Trash list, its pagination and the retention purge
+        'CREATE INDEX idx_notes_trash ON notes(trashed_at, id) '
+        'WHERE trashed_at IS NOT NULL',
+        # get_notes_by_tag and tag counts; the primary key leads with note_id
+        'CREATE INDEX idx_note_tags_tag ON note_tags(tag_id, note_id)',
+    ),
+    # 3: plain text and card preview derived from content at write time.
+    (
+        "ALTER TABLE notes ADD COLUMN plain_text TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE notes ADD COLUMN preview TEXT NOT NULL DEFAULT ''",
+        lambda db: _backfill_derived_text(db),
+    ),
+    # 4: index plain text and tag names instead of the raw JSON, which
+    # matched format keys ("blocks", "bold", ...) in every note.
+    (
+        'DROP TRIGGER notes_ai',
+        'DROP TRIGGER notes_ad',
+        'DROP TRIGGER notes_au',
+        'DROP TABLE notes_fts',
+        "ALTER TABLE notes ADD COLUMN tag_names TEXT NOT NULL DEFAULT ''",
+        lambda db: db.execute(f'UPDATE notes SET tag_names = {_TAG_NAMES_SQL}'),
+        '''CREATE VIRTUAL TABLE notes_fts USING fts5(
+            title, plain_text, tag_names, content=notes, content_rowid=rowid
+        )''',
+        '''CREATE TRIGGER notes_ai AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts(rowid, title, plain_text, tag_names)
+            VALUES (new.rowid, new.title, new.plain_text, new.tag_names);
+        END''',
+        '''CREATE TRIGGER notes_ad AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, plain_text, tag_names)
+            VALUES ('delete', old.rowid, old.title, old.plain_text, old.tag_names);
+        END''',
+        '''CREATE TRIGGER notes_au AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, plain_text, tag_names)
+            VALUES ('delete', old.rowid, old.title, old.plain_text, old.tag_names);
+            INSERT INTO notes_fts(rowid, title, plain_text, tag_names)
+            VALUES (new.rowid, new.title, new.plain_text, new.tag_names);
+        END''',
+        "INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')",
+    ),
+    # 5: only reindex when an indexed column really changes, so color,
+    # trash/restore and timestamp updates leave the search index alone.
+    (
+        'DROP TRIGGER notes_au',
+        '''CREATE TRIGGER notes_au
+        AFTER UPDATE OF title, plain_text, tag_names ON notes
+        WHEN old.title IS NOT new.title
+            OR old.plain_text IS NOT new.plain_text
+            OR old.tag_names IS NOT new.tag_names
+        BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, plain_text, tag_names)
+            VALUES ('delete', old.rowid, old.title, old.plain_text, old.tag_names);
+            INSERT INTO notes_fts(rowid, title, plain_text, tag_names)
+            VALUES (new.rowid, new.title, new.plain_text, new.tag_names);
+        END''',
+    ),
+]
+
+# Space-separated tag names of the note in the current UPDATE, for the
+# denormalized notes.tag_names column that feeds the search index.
+_TAG_NAMES_SQL = '''(
+    SELECT coalesce(group_concat(name, ' '), '') FROM (
+        SELECT t.name FROM note_tags nt JOIN tags t ON t.id = nt.tag_id
+        WHERE nt.note_id = notes.id ORDER BY t.name
+    )
+)'''
+
+
+def _decode_content(value):
+    """Return the note text for a stored notes.content value."""
+    if isinstance(value, bytes):
+        if value.startswith(_COMPRESSED_MARKER):
+            value = zlib.decompress(value[len(_COMPRESSED_MARKER):])
+        return value.decode()
+    return value
+
+
+def _derived_text(content):
+    """Columns derived from note content, kept in sync on every write."""
+    plain_text = get_plain_text(content)
+    return {'plain_text': plain_text, 'preview': make_preview(plain_text)}
+
+
+def _backfill_derived_text(db):
+    rows = db.execute('SELECT rowid, content FROM notes').fetchall()
+    db.executemany(
+        'UPDATE notes SET plain_text = :plain_text, preview = :preview '
+        'WHERE rowid = :rowid',
+        [dict(_derived_text(_decode_content(content)), rowid=rowid)
+         for rowid, content in rows],
+    )
+
+
+def _writes(method):
+    """Serialize a mutating method on the writer connection."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._writing():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class NoteStore:
-
-    def __init__(self, db_path=None):
+    """SQLite-backed note storage, safe to share between threads.
+
+    Writes go through one writer connection guarded by a lock. Reads use
+    a bounded pool of read-only connections so they can run in parallel
+    with each other and with a write under WAL.
+
+    Every mutation publishes ChangeEvents. They are delivered to
+    subscribers as one batch when the outermost write or transaction
+    finishes; events of a rolled-back block are dropped.
+    """
+
+    def __init__(self, db_path=None, durability=DEFAULT_DURABILITY,
+                 group_commit_ms=0, read_pool_size=READ_POOL_SIZE,
+                 compress_min_bytes=CONTENT_COMPRESS_MIN_BYTES):
+        if durability not in DURABILITY_PROFILES:
+            raise ValueError(f'Unknown durability profile: {durability!r}')
         if db_path is None:
             data_dir = os.path.join(GLib.get_user_data_dir(), 'betternotes')
             os.makedirs(data_dir, exist_ok=True)
             db_path = os.path.join(data_dir, 'notes.db')
 
-        self._db = sqlite3.connect(db_path)
+        # With group_commit_ms > 0, commits issued outside an explicit
+        # transaction are deferred and coalesced into one commit that
+        # lands at most group_commit_ms later.
+        self._group_commit_ms = group_commit_ms
+        self._flush_source_id = None
+        self._commit_pending = False
+        self._tx_depth = 0
+
+        # Content of at least this many UTF-8 bytes is stored compressed;
+        # None stores everything as plain text.
+        self._compress_min_bytes = compress_min_bytes
+
+        self._write_lock = threading.RLock()
+        self._writer_thread = None
+        self._write_depth = 0
+        self._events = []
+        # len(self._events) at the start of each open transaction block
+        self._event_marks = []
+        self._subscribers = []
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
         self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(f'PRAGMA synchronous={DURABILITY_PROFILES[durability]}')
         self._db.execute('PRAGMA foreign_keys=ON')
         self._db.row_factory = sqlite3.Row
-        self._create_tables()
+        self._migrate()
         self._purge_old_trash()
 
-    def _create_tables(self):
-        self._db.executescript('''
-            CREATE TABLE IF NOT EXISTS notes (
-                id TEXT PRIMARY KEY,
-                title TEXT NOT NULL DEFAULT '',
-                content TEXT NOT NULL DEFAULT '',
-                color TEXT NOT NULL DEFAULT 'yellow',
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                trashed_at TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS tags (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE
-            );
-
-            CREATE TABLE IF NOT EXISTS note_tags (
-                note_id TEXT NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
-                tag_id TEXT NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
-                PRIMARY KEY (note_id, tag_id)
-            );
-
-            CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
-                title, content, content=notes, content_rowid=rowid
-            );
-
-            CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
-                INSERT INTO notes_fts(rowid, title, content)
-                VALUES (new.rowid, new.title, new.content);
-            END;
-
-            CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
-                INSERT INTO notes_fts(notes_fts, rowid, title, content)
-                VALUES ('delete', old.rowid, old.title, old.content);
-            END;
-
-            CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
-                INSERT INTO notes_fts(notes_fts, rowid, title, content)
-                VALUES ('delete', old.rowid, old.title, old.content);
-                INSERT INTO notes_fts(rowid, title, content)
-                VALUES (new.rowid, new.title, new.content);
-            END;
-        ''')
+        # In-memory databases are private to their connection: no pool.
+        self._read_uri = None
+        if db_path != ':memory:' and read_pool_size > 0:
+            self._read_uri = f'file:{pathname2url(os.path.abspath(db_path))}?mode=ro'
+        self._read_pool = queue.LifoQueue()
+        self._trace_callback = None
+        self._readers_free = threading.Semaphore(max(read_pool_size, 1))
+
+    def _migrate(self):
+        """Bring the schema up to date, tracked by PRAGMA user_version."""
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        for target in range(version + 1, len(_MIGRATIONS) + 1):
+            self._db.execute('BEGIN')
+            try:
+                for step in _MIGRATIONS[target - 1]:
+                    if callable(step):
+                        step(self._db)
+                    else:
+                        self._db.execute(step)
+                self._db.execute(f'PRAGMA user_version = {target}')
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    # --- Transactions ---
+
+    @contextmanager
+    def transaction(self):
+        """Run several mutations as one atomic unit with a single commit.
+
+        Blocks may nest; only the outermost one commits. An exception
+        rolls back the work done inside the block that raised it. Other
+        threads' writes wait until the block has finished.
+        """
+        with self._writing():
+            if not self._db.in_transaction:
+                self._db.execute('BEGIN')
+            self._tx_depth += 1
+            savepoint = f'tx{self._tx_depth}'
+            self._db.execute(f'SAVEPOINT {savepoint}')
+            events_mark = len(self._events)
+            self._event_marks.append(events_mark)
+            try:
+                yield self
+            except BaseException:
+                self._db.execute(f'ROLLBACK TO {savepoint}')
+                self._db.execute(f'RELEASE {savepoint}')
+                del self._events[events_mark:]
+                raise
+            else:
+                self._db.execute(f'RELEASE {savepoint}')
+            finally:
+                self._event_marks.pop()
+                self._tx_depth -= 1
+                self._commit()
+            # The block stands: its events may join the run before it
+            self._fold_event(events_mark)
+
+    @_writes
+    def flush(self):
+        """Commit any writes still waiting for a group commit."""
+        if self._flush_source_id is not None:
+            GLib.source_remove(self._flush_source_id)
+            self._flush_source_id = None
+        if self._tx_depth == 0 and self._db.in_transaction:
+            self._db.commit()
+            self._commit_pending = False
+
+    def _commit(self):
+        if self._tx_depth:
+            return
+        if self._group_commit_ms <= 0:
+            self._db.commit()
+        else:
+            self._commit_pending = True
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Arrange for flush() to run once the group-commit window ends."""
+        if self._flush_source_id is None:
+            self._flush_source_id = GLib.timeout_add(
+                self._group_commit_ms, self._on_group_commit_timeout,
+            )
+
+    def _on_group_commit_timeout(self):
+        self._flush_source_id = None
+        self.flush()
+        return GLib.SOURCE_REMOVE
+
+    # --- Connections ---
+
+    @contextmanager
+    def _writing(self):
+        with self._write_lock:
+            outer = self._writer_thread
+            self._writer_thread = threading.get_ident()
+            self._write_depth += 1
+            try:
+                yield self._db
+            finally:
+                self._writer_thread = outer
+                self._write_depth -= 1
+                if self._write_depth == 0 and self._events:
+                    self._dispatch_events()
+
+    @contextmanager
+    def _reader(self):
+        """Yield a connection to run a read on.
+
+        Uncommitted writes are only visible on the writer, so reads are
+        routed there while this thread is writing or a group commit is
+        pending, and when there is no read pool.
+        """
+        if (self._read_uri is None or self._commit_pending
+                or self._writer_thread == threading.get_ident()):
+            with self._writing() as db:
+                yield db
+            return
+
+        self._readers_free.acquire()
+        try:
+            try:
+                db = self._read_pool.get_nowait()
+            except queue.Empty:
+                db = sqlite3.connect(
+                    self._read_uri, uri=True, check_same_thread=False,
+                )
+                db.row_factory = sqlite3.Row
+                db.set_trace_callback(self._trace_callback)
+            try:
+                yield db
+            finally:
+                self._read_pool.put(db)
+        finally:
+            self._readers_free.release()
+
+    def set_trace_callback(self, callback):
+        """Install callback(sql) on every connection, current and future."""
+        self._trace_callback = callback
+        self._db.set_trace_callback(callback)
+        idle = []
+        while True:
+            try:
+                idle.append(self._read_pool.get_nowait())
+            except queue.Empty:
+                break
+        for db in idle:
+            db.set_trace_callback(callback)
+            self._read_pool.put(db)
+
+    # --- Change events ---
+
+    def subscribe(self, callback):
+        """Call callback(events) with each batch of ChangeEvents.
+
+        Runs on the writing thread, with the write lock held, right after
+        the batch's outermost write or transaction has finished.
+        """
+        self._subscribers.append(callback)
+
+    def _publish(self, kind, note_ids, fields=()):
+        note_ids = frozenset(note_ids)
+        if not note_ids:
+            return
+        self._events.append(ChangeEvent(kind, note_ids, frozenset(fields)))
+        self._fold_event(len(self._events) - 1)
+
+    def _fold_event(self, i):
+        """Merge event i into the one before it if both are of the same
+        kind, e.g. the tag edits of one dialog. Events from before the
+        innermost open transaction block are left alone, so that a
+        rollback can drop everything the block published."""
+        mark = self._event_marks[-1] if self._event_marks else 0
+        if not mark < i < len(self._events):
+            return
+        last, event = self._events[i - 1], self._events[i]
+        if last.kind == event.kind:
+            self._events[i - 1:i + 1] = [ChangeEvent(
+                event.kind, last.note_ids | event.note_ids,
+                last.fields | event.fields,
+            )]
+
+    def _dispatch_events(self):
+        events, self._events = self._events, []
+        for callback in tuple(self._subscribers):
+            try:
+                callback(events)
+            except Exception:
+                logger.exception('Change event subscriber failed')
 
     # --- Notes CRUD ---
 
+    @_writes
     def create_note(self, title='', content='', color='yellow') -> Note:
         note_id = str(uuid.uuid4())
         now = datetime.now().isoformat()
+        derived = _derived_text(content)
         self._db.execute(
-            'INSERT INTO notes (id, title, content, color, created_at, updated_at) '
-            'VALUES (?, ?, ?, ?, ?, ?)',
-            (note_id, title, content, color, now, now),
+            'INSERT INTO notes (id, title, content, plain_text, preview, '
+            'color, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (note_id, title, self._encode_content(content), derived['plain_text'],
+             derived['preview'], color, now, now),
         )
-        self._db.commit()
+        self._publish('created', [note_id])
+        self._commit()
         return Note(
             id=note_id, title=title, content=content, color=color,
-            created_at=now, updated_at=now,
+            created_at=now, updated_at=now, preview=derived['preview'],
         )
 
     def get_note(self, note_id) -> Note | None:
+        with self._reader() as db:
+            row = db.execute(
+                'SELECT * FROM notes WHERE id = ?', (note_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._rows_to_notes(db, [row])[0]
+
+    def get_note_summaries(self, note_ids) -> list[NoteSummary]:
+        """Return the non-trashed notes among note_ids, newest first."""
+        note_ids = list(note_ids)
+        rows = []
+        with self._reader() as db:
+            for i in range(0, len(note_ids), _MAX_SQL_VARIABLES):
+                chunk = note_ids[i:i + _MAX_SQL_VARIABLES]
+                placeholders = ','.join('?' * len(chunk))
+                rows += db.execute(
+                    f'SELECT {_SUMMARY_COLUMNS} FROM notes n '
+                    f'WHERE n.id IN ({placeholders}) AND n.trashed_at IS NULL',
+                    chunk,
+                ).fetchall()
+            rows.sort(key=lambda r: (r['updated_at'], r['id']), reverse=True)
+            return self._rows_to_summaries(db, rows)
+
+    def get_all_notes(self, include_trashed=False) -> list[NoteSummary]:
+        """Unpaginated variant of get_notes_page: every note, newest
+        first, as summaries; use get_note() for the content."""
+        where = '' if include_trashed else 'WHERE n.trashed_at IS NULL '
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n {where}'
+                f'ORDER BY n.updated_at DESC, n.id DESC'
+            ).fetchall()
+            return self._rows_to_summaries(db, rows)
+
+    def get_trashed_notes(self) -> list[NoteSummary]:
+        """Unpaginated variant of get_trashed_notes_page."""
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n '
+                f'WHERE n.trashed_at IS NOT NULL '
+                f'ORDER BY n.trashed_at DESC, n.id DESC'
+            ).fetchall()
+            return self._rows_to_summaries(db, rows)
+
+    def get_notes_page(self, cursor=None, limit=NOTES_PAGE_SIZE,
+                       tag_name=None) -> NotePage:
+        """Return non-trashed notes newest first, keyset-paginated on
+        (updated_at, id), optionally restricted to one tag."""
+        clauses = ['n.trashed_at IS NULL']
+        params = []
+        join = ''
+        if tag_name is not None:
+            join = ('JOIN note_tags nt ON n.id = nt.note_id '
+                    'JOIN tags t ON nt.tag_id = t.id ')
+            clauses.append('t.name = ?')
+            params.append(tag_name)
+        if cursor is not None:
+            clauses.append('(n.updated_at, n.id) < (?, ?)')
+            params.extend(self._decode_cursor(cursor))
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n {join}'
+                f'WHERE {" AND ".join(clauses)} '
+                f'ORDER BY n.updated_at DESC, n.id DESC LIMIT ?',
+                params + [limit + 1],
+            ).fetchall()
+            return self._rows_to_page(
+                db, rows, limit, lambda r: (r['updated_at'], r['id']),
+            )
+
+    def get_trashed_notes_page(self, cursor=None,
+                               limit=NOTES_PAGE_SIZE) -> NotePage:
+        """Return trashed notes most recently trashed first, keyset-paginated
+        on (trashed_at, id)."""
+        clauses = ['trashed_at IS NOT NULL']
+        params = []
+        if cursor is not None:
+            clauses.append('(trashed_at, id) < (?, ?)')
+            params.extend(self._decode_cursor(cursor))
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n '
+                f'WHERE {" AND ".join(clauses)} '
+                f'ORDER BY trashed_at DESC, id DESC LIMIT ?',
+                params + [limit + 1],
+            ).fetchall()
+            return self._rows_to_page(
+                db, rows, limit, lambda r: (r['trashed_at'], r['id']),
+            )
+
+    @_writes
+    def update_note(self, note_id, **fields) -> bool:
+        """Write the given fields, skipping any whose stored value is
+        identical. Returns whether anything was written."""
+        if not fields:
+            return False
         row = self._db.execute(
-            'SELECT * FROM notes WHERE id = ?', (note_id,)
+            f'SELECT {", ".join(fields)} FROM notes WHERE id = ?', (note_id,)
         ).fetchone()
         if row is None:
-            return None
-        return self._row_to_note(row)
-
-    def get_all_notes(self, include_trashed=False) -> list[Note]:
-        if include_trashed:
-            rows = self._db.execute(
-                'SELECT * FROM notes ORDER BY updated_at DESC'
-            ).fetchall()
-        else:
-            rows = self._db.execute(
-                'SELECT * FROM notes WHERE trashed_at IS NULL '
-                'ORDER BY updated_at DESC'
-            ).fetchall()
-        return [self._row_to_note(row) for row in rows]
-
-    def get_trashed_notes(self) -> list[Note]:
-        rows = self._db.execute(
-            'SELECT * FROM notes WHERE trashed_at IS NOT NULL '
-            'ORDER BY trashed_at DESC'
-        ).fetchall()
-        return [self._row_to_note(row) for row in rows]
-
-    def update_note(self, note_id, **fields):
+            return False
+        content = fields.get('content')
+        if content is not None:
+            # Compression is deterministic, so comparing the stored form
+            # spares decompressing the old content.
+            fields['content'] = self._encode_content(content)
+        fields = {k: v for k, v in fields.items() if row[k] != v}
         if not fields:
-            return
+            return False
+        changed = list(fields)
+        if 'content' in fields:
+            fields.update(_derived_text(content))
         fields['updated_at'] = datetime.now().isoformat()
         set_clause = ', '.join(f'{k} = ?' for k in fields)
         values = list(fields.values()) + [note_id]
         self._db.execute(
             f'UPDATE notes SET {set_clause} WHERE id = ?', values
         )
-        self._db.commit()
+        self._publish('updated', [note_id], changed)
+        self._commit()
+        return True
 
+    @_writes
     def trash_note(self, note_id):
         now = datetime.now().isoformat()
-        self._db.execute(
+        cursor = self._db.execute(
             'UPDATE notes SET trashed_at = ?, updated_at = ? WHERE id = ?',
             (now, now, note_id),
         )
-        self._db.commit()
+        if cursor.rowcount:
+            self._publish('trashed', [note_id])
+        self._commit()
 
+    @_writes
     def restore_note(self, note_id):
         now = datetime.now().isoformat()
-        self._db.execute(
+        cursor = self._db.execute(
             'UPDATE notes SET trashed_at = NULL, updated_at = ? WHERE id = ?',
             (now, note_id),
         )
-        self._db.commit()
+        if cursor.rowcount:
+            self._publish('restored', [note_id])
+        self._commit()
 
+    @_writes
     def delete_note(self, note_id):
-        self._db.execute('DELETE FROM notes WHERE id = ?', (note_id,))
-        self._db.commit()
+        cursor = self._db.execute('DELETE FROM notes WHERE id = ?', (note_id,))
+        if cursor.rowcount:
+            self._publish('deleted', [note_id])
+        self._commit()
 
+    @_writes
     def trash_notes(self, note_ids):
         if not note_ids:
             return
         placeholders = ','.join('?' * len(note_ids))
         now = datetime.now().isoformat()
-        self._db.execute(
+        trashed = [r['id'] for r in self._db.execute(
             f'UPDATE notes SET trashed_at = ?, updated_at = ? '
-            f'WHERE id IN ({placeholders})',
+            f'WHERE id IN ({placeholders}) RETURNING id',
             [now, now] + list(note_ids),
-        )
-        self._db.commit()
+        )]
+        self._publish('trashed', trashed)
+        self._commit()
 
+    @_writes
     def restore_notes(self, note_ids):
         if not note_ids:
             return
         placeholders = ','.join('?' * len(note_ids))
         now = datetime.now().isoformat()
-        self._db.execute(
+        restored = [r['id'] for r in self._db.execute(
             f'UPDATE notes SET trashed_at = NULL, updated_at = ? '
-            f'WHERE id IN ({placeholders})',
+            f'WHERE id IN ({placeholders}) RETURNING id',
             [now] + list(note_ids),
-        )
-        self._db.commit()
+        )]
+        self._publish('restored', restored)
+        self._commit()
 
+    @_writes
     def delete_notes(self, note_ids):
         if not note_ids:
             return
         placeholders = ','.join('?' * len(note_ids))
-        self._db.execute(
-            f'DELETE FROM notes WHERE id IN ({placeholders})',
+        deleted = [r['id'] for r in self._db.execute(
+            f'DELETE FROM notes WHERE id IN ({placeholders}) RETURNING id',
             list(note_ids),
-        )
-        self._db.commit()
+        )]
+        self._publish('deleted', deleted)
+        self._commit()
 
+    @_writes
     def empty_trash(self):
+        note_ids = [r['id'] for r in self._db.execute(
+            'SELECT id FROM notes WHERE trashed_at IS NOT NULL'
+        )]
         self._db.execute('DELETE FROM notes WHERE trashed_at IS NOT NULL')
-        self._db.commit()
+        self._publish('deleted', note_ids)
+        self._commit()
 
+    @_writes
     def _purge_old_trash(self):
         cutoff = (datetime.now() - timedelta(days=TRASH_RETENTION_DAYS)).isoformat()
+        note_ids = [r['id'] for r in self._db.execute(
+            'SELECT id FROM notes WHERE trashed_at IS NOT NULL AND trashed_at < ?',
+            (cutoff,),
+        )]
         self._db.execute(
             'DELETE FROM notes WHERE trashed_at IS NOT NULL AND trashed_at < ?',
             (cutoff,),
         )
-        self._db.commit()
+        self._publish('deleted', note_ids)
+        self._commit()
 
     # --- Search ---
 
-    def search_notes(self, query) -> list[Note]:
+    def search_notes(self, query) -> list[NoteSummary]:
+        """Unpaginated variant of search_notes_page."""
         if not query or not query.strip():
             return self.get_all_notes()
         # Escape FTS5 special characters and add prefix matching
         safe_query = query.replace('"', '""')
         fts_query = f'"{safe_query}"*'
-        rows = self._db.execute(
-            'SELECT n.* FROM notes n '
-            'JOIN notes_fts f ON n.rowid = f.rowid '
-            'WHERE notes_fts MATCH ? AND n.trashed_at IS NULL '
-            'ORDER BY rank',
-            (fts_query,),
-        ).fetchall()
-        return [self._row_to_note(row) for row in rows]
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n '
+                f'JOIN notes_fts f ON n.rowid = f.rowid '
+                f'WHERE notes_fts MATCH ? AND n.trashed_at IS NULL '
+                f'ORDER BY f.rank, n.rowid',
+                (fts_query,),
+            ).fetchall()
+            return self._rows_to_summaries(db, rows)
+
+    def search_notes_page(self, query, cursor=None,
+                          limit=NOTES_PAGE_SIZE) -> NotePage:
+        """Paginated variant of search_notes, keyset-paginated on
+        (rank, rowid).
+
+        Ranks are relative to the whole index, so any write can reorder
+        the results: a cursor is only valid until the next write, after
+        which callers should start again from the first page.
+        """
+        if not query or not query.strip():
+            return self.get_notes_page(cursor, limit)
+        safe_query = query.replace('"', '""')
+        fts_query = f'"{safe_query}"*'
+        clauses = ['notes_fts MATCH ?', 'n.trashed_at IS NULL']
+        params = [fts_query]
+        if cursor is not None:
+            clauses.append('(f.rank, n.rowid) > (?, ?)')
+            params.extend(self._decode_cursor(cursor))
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS}, n.rowid AS fts_rowid, '
+                f'f.rank AS fts_rank '
+                f'FROM notes n JOIN notes_fts f ON n.rowid = f.rowid '
+                f'WHERE {" AND ".join(clauses)} '
+                f'ORDER BY f.rank, n.rowid LIMIT ?',
+                params + [limit + 1],
+            ).fetchall()
+            return self._rows_to_page(
+                db, rows, limit, lambda r: (r['fts_rank'], r['fts_rowid']),
+            )
 
     # --- Tags ---
 
+    @_writes
     def create_tag(self, name) -> Tag:
         tag_id = str(uuid.uuid4())
         self._db.execute(
             'INSERT OR IGNORE INTO tags (id, name) VALUES (?, ?)',
             (tag_id, name),
         )
-        self._db.commit()
+        self._commit()
         row = self._db.execute(
             'SELECT * FROM tags WHERE name = ?', (name,)
         ).fetchone()
         return Tag(id=row['id'], name=row['name'])
 
     def get_all_tags(self) -> list[Tag]:
-        rows = self._db.execute(
-            'SELECT t.*, COUNT(nt.note_id) as note_count '
-            'FROM tags t '
-            'LEFT JOIN note_tags nt ON t.id = nt.tag_id '
-            'LEFT JOIN notes n ON nt.note_id = n.id AND n.trashed_at IS NULL '
-            'GROUP BY t.id ORDER BY t.name'
-        ).fetchall()
+        with self._reader() as db:
+            rows = db.execute(
+                'SELECT t.*, COUNT(nt.note_id) as note_count '
+                'FROM tags t '
+                'LEFT JOIN note_tags nt ON t.id = nt.tag_id '
+                'LEFT JOIN notes n ON nt.note_id = n.id AND n.trashed_at IS NULL '
+                'GROUP BY t.id ORDER BY t.name'
+            ).fetchall()
         return [Tag(id=r['id'], name=r['name'], note_count=r['note_count']) for r in rows]
 
+    @_writes
     def add_tag_to_note(self, note_id, tag_name):
         tag = self.create_tag(tag_name)
         self._db.execute(
             'INSERT OR IGNORE INTO note_tags (note_id, tag_id) VALUES (?, ?)',
             (note_id, tag.id),
         )
-        self._db.commit()
+        self._update_tag_names([note_id])
+        self._publish('tagged', [note_id], ['tags'])
+        self._commit()
 
+    @_writes
     def remove_tag_from_note(self, note_id, tag_name):
         self._db.execute(
             'DELETE FROM note_tags WHERE note_id = ? AND tag_id = '
             '(SELECT id FROM tags WHERE name = ?)',
             (note_id, tag_name),
         )
-        self._db.commit()
+        self._update_tag_names([note_id])
+        self._publish('tagged', [note_id], ['tags'])
+        self._commit()
 
     def get_tags_for_note(self, note_id) -> list[str]:
-        rows = self._db.execute(
-            'SELECT t.name FROM tags t '
-            'JOIN note_tags nt ON t.id = nt.tag_id '
-            'WHERE nt.note_id = ? ORDER BY t.name',
-            (note_id,),
-        ).fetchall()
+        with self._reader() as db:
+            rows = db.execute(
+                'SELECT t.name FROM tags t '
+                'JOIN note_tags nt ON t.id = nt.tag_id '
+                'WHERE nt.note_id = ? ORDER BY t.name',
+                (note_id,),
+            ).fetchall()
         return [r['name'] for r in rows]
 
-    def get_notes_by_tag(self, tag_name) -> list[Note]:
-        rows = self._db.execute(
-            'SELECT n.* FROM notes n '
-            'JOIN note_tags nt ON n.id = nt.note_id '
-            'JOIN tags t ON nt.tag_id = t.id '
-            'WHERE t.name = ? AND n.trashed_at IS NULL '
-            'ORDER BY n.updated_at DESC',
-            (tag_name,),
-        ).fetchall()
-        return [self._row_to_note(row) for row in rows]
+    def get_tags_for_notes(self, note_ids) -> dict[str, list[str]]:
+        """Fetch tag names for many notes at once, keyed by note id."""
+        with self._reader() as db:
+            return self._query_tags(db, note_ids)
+
+    def _query_tags(self, db, note_ids):
+        note_ids = list(note_ids)
+        tags = {note_id: [] for note_id in note_ids}
+        for i in range(0, len(note_ids), _MAX_SQL_VARIABLES):
+            chunk = note_ids[i:i + _MAX_SQL_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            rows = db.execute(
+                f'SELECT nt.note_id, t.name FROM note_tags nt '
+                f'JOIN tags t ON t.id = nt.tag_id '
+                f'WHERE nt.note_id IN ({placeholders}) '
+                f'ORDER BY t.name',
+                chunk,
+            ).fetchall()
+            for r in rows:
+                tags[r['note_id']].append(r['name'])
+        return tags
+
+    def get_notes_by_tag(self, tag_name) -> list[NoteSummary]:
+        """Unpaginated variant of get_notes_page(tag_name=...)."""
+        with self._reader() as db:
+            rows = db.execute(
+                f'SELECT {_SUMMARY_COLUMNS} FROM notes n '
+                f'JOIN note_tags nt ON n.id = nt.note_id '
+                f'JOIN tags t ON nt.tag_id = t.id '
+                f'WHERE t.name = ? AND n.trashed_at IS NULL '
+                f'ORDER BY n.updated_at DESC, n.id DESC',
+                (tag_name,),
+            ).fetchall()
+            return self._rows_to_summaries(db, rows)
 
+    @_writes
     def delete_tag(self, tag_name):
+        note_ids = [r['note_id'] for r in self._db.execute(
+            'SELECT nt.note_id FROM note_tags nt JOIN tags t ON t.id = nt.tag_id '
+            'WHERE t.name = ?',
+            (tag_name,),
+        )]
         self._db.execute('DELETE FROM tags WHERE name = ?', (tag_name,))
-        self._db.commit()
+        self._update_tag_names(note_ids)
+        self._publish('tagged', note_ids, ['tags'])
+        self._commit()
+
+    def _update_tag_names(self, note_ids):
+        """Recompute notes.tag_names after a tag change; the FTS triggers
+        then reindex those notes."""
+        for i in range(0, len(note_ids), _MAX_SQL_VARIABLES):
+            chunk = note_ids[i:i + _MAX_SQL_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            self._db.execute(
+                f'UPDATE notes SET tag_names = {_TAG_NAMES_SQL} '
+                f'WHERE id IN ({placeholders})',
+                chunk,
+            )
 
     # --- Helpers ---
 
-    def _row_to_note(self, row) -> Note:
-        note = Note(
+    def _encode_content(self, content):
+        """Return the notes.content value to store for a note's text:
+        compressed when it is large and compression actually helps."""
+        if self._compress_min_bytes is None:
+            return content
+        data = content.encode()
+        if len(data) < self._compress_min_bytes:
+            return content
+        compressed = _COMPRESSED_MARKER + zlib.compress(data, _COMPRESS_LEVEL)
+        return compressed if len(compressed) < len(data) else content
+
+    def _row_to_note(self, row, tags) -> Note:
+        return Note(
             id=row['id'],
             title=row['title'],
-            content=row['content'],
+            content=_decode_content(row['content']),
             color=row['color'],
             created_at=row['created_at'],
             updated_at=row['updated_at'],
             trashed_at=row['trashed_at'],
+            tags=tags,
+            preview=row['preview'],
         )
-        note.tags = self.get_tags_for_note(note.id)
-        return note
+
+    def _rows_to_notes(self, db, rows) -> list[Note]:
+        """Build notes for a result set, hydrating tags in bulk."""
+        tags = self._query_tags(db, (row['id'] for row in rows))
+        return [self._row_to_note(row, tags[row['id']]) for row in rows]
+
+    def _rows_to_summaries(self, db, rows) -> list[NoteSummary]:
+        tags = self._query_tags(db, (row['id'] for row in rows))
+        return [
+            NoteSummary(
+                id=row['id'],
+                title=row['title'],
+                color=row['color'],
+                updated_at=row['updated_at'],
+                preview=row['preview'],
+                trashed_at=row['trashed_at'],
+                tags=tags[row['id']],
+            )
+            for row in rows
+        ]
+
+    def _rows_to_page(self, db, rows, limit, cursor_key) -> NotePage:
+        """Turn a LIMIT limit + 1 result into a page of summaries and
+        its continuation."""
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = json.dumps(cursor_key(rows[-1]))
+        return NotePage(self._rows_to_summaries(db, rows), next_cursor)
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            values = json.loads(cursor)
+        except (json.JSONDecodeError, TypeError):
+            raise ValueError(f'Invalid page cursor: {cursor!r}')
+        if not isinstance(values, list) or len(values) != 2:
+            raise ValueError(f'Invalid page cursor: {cursor!r}')
+        return values
 
     def close(self):
+        self.flush()
         self._db.close()
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
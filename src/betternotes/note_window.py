@@ -8,11 +8,12 @@ from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk, Pango
 
 from betternotes.auto_save import AutoSave
 from betternotes.colors import COLOR_NAMES
-from betternotes.constants import APP_ID
+from betternotes.constants import APP_ID, JOURNAL_DELAY_MS
+from betternotes.edit_journal import EditJournal
 from betternotes.rich_text_serializer import (
     TAG_NAMES,
+    IncrementalSerializer,
     deserialize_to_buffer,
-    serialize_buffer,
     _ensure_tags,
 )
 from betternotes.rich_text_toolbar import RichTextToolbar
@@ -34,9 +35,19 @@ class NoteWindow(Adw.Window):
 
         self._build_ui()
         self._load_note()
+        # Autosaves re-serialize only the lines edited since the last one
+        self._serializer = IncrementalSerializer(self._buffer)
         self._apply_color(note.color)
 
-        self._auto_save = AutoSave(self._save_note)
+        # Edits are journaled within JOURNAL_DELAY_MS, so the note itself
+        # can be saved far less often
+        self._journal = EditJournal(note.id, note.title, note.content)
+        self._journal_source_id = None
+        self._last_save = None  # Future of the latest save
+        self._closed = False
+        self._auto_save = AutoSave(self._collect_note, self._save_note)
+        # Closing or re-saving an unedited note then writes nothing
+        self._auto_save.mark_saved(*self._collect_note())
 
         self._setup_actions()
         self._setup_key_controller()
@@ -240,23 +251,51 @@ xlib.XCloseDisplay(dpy)
     def _on_color_selected(self, btn, color_name, popover):
         popover.popdown()
         self._apply_color(color_name)
-        self._app.store.update_note(self._note.id, color=color_name)
-        self._app.emit('note-changed', self._note.id)
+        self._app.store.submit('update_note', self._note.id, color=color_name)
 
     def _on_content_changed(self, *args):
         if hasattr(self, '_auto_save'):
             self._auto_save.trigger()
+            if self._journal_source_id is None:
+                self._journal_source_id = GLib.timeout_add(
+                    JOURNAL_DELAY_MS, self._on_journal_timeout,
+                    priority=GLib.PRIORITY_DEFAULT_IDLE,
+                )
+
+    def _on_journal_timeout(self):
+        self._journal_source_id = None
+        self._record_edits()
+        return GLib.SOURCE_REMOVE
 
-    def _save_note(self):
-        title = self._title_entry.get_text()
-        content = serialize_buffer(self._buffer)
+    def _record_edits(self):
+        if self._journal_source_id is not None:
+            GLib.source_remove(self._journal_source_id)
+            self._journal_source_id = None
+        self._journal.record(
+            self._title_entry.get_text(), self._serializer.document(),
+        )
+
+    def _collect_note(self):
+        return self._title_entry.get_text(), self._serializer.serialize()
+
+    def _save_note(self, title, content):
         self.set_title(title or 'Untitled Note')
         self._note.title = title
         self._note.content = content
-        self._app.store.update_note(
-            self._note.id, title=title, content=content,
+        self._record_edits()
+        digest = self._journal.checkpoint(title, content)
+        # Saves are seconds apart: commit each one rather than wait for
+        # a group commit, and drop the journal it makes redundant
+        self._last_save = self._app.store.run(
+            _commit_save, self._note.id, title, content,
+            callback=lambda _: self._on_save_committed(digest),
         )
-        self._app.emit('note-changed', self._note.id)
+        return self._last_save
+
+    def _on_save_committed(self, digest):
+        # Once closed, the journal belongs to the database thread
+        if not self._closed:
+            self._journal.compact(digest)
 
     def _on_cursor_moved(self, buffer, iter_, mark):
         if mark.get_name() == 'insert':
@@ -329,8 +368,7 @@ xlib.XCloseDisplay(dpy)
 
     def _on_trash(self, btn):
         self._auto_save.save_now()
-        self._app.store.trash_note(self._note.id)
-        self._app.emit('note-trashed', self._note.id)
+        self._app.store.submit('trash_note', self._note.id)
         self.close()
 
     def _on_manage_tags(self, btn):
@@ -357,14 +395,13 @@ xlib.XCloseDisplay(dpy)
         new_tags = {t.strip() for t in entry.get_text().split(',') if t.strip()}
         old_tags = set(self._note.tags)
 
-        for tag in old_tags - new_tags:
-            self._app.store.remove_tag_from_note(self._note.id, tag)
-        for tag in new_tags - old_tags:
-            self._app.store.add_tag_to_note(self._note.id, tag)
+        self._app.store.run(
+            _apply_tag_changes, self._note.id,
+            old_tags - new_tags, new_tags - old_tags,
+        )
 
         self._note.tags = sorted(new_tags)
         self._update_tags_bar()
-        self._app.emit('note-changed', self._note.id)
 
     def _update_tags_bar(self):
         # Clear existing
@@ -461,4 +498,31 @@ xlib.XCloseDisplay(dpy)
     def do_close_request(self):
         if hasattr(self, '_auto_save'):
             self._auto_save.save_now()
+            if self._journal_source_id is not None:
+                GLib.source_remove(self._journal_source_id)
+                self._journal_source_id = None
+            # Discard on the database thread, right after the last save:
+            # main loop callbacks no longer run once the app quits.
+            self._closed = True
+            self._app.store.run(_discard_journal, self._journal, self._last_save)
         return False
+
+
+def _commit_save(store, note_id, title, content):
+    store.update_note(note_id, title=title, content=content)
+    store.flush()
+
+
+def _discard_journal(store, journal, last_save):
+    """Delete a closed note's journal, unless its last save failed and
+    recover_journals() still needs it."""
+    if last_save is None or last_save.exception() is None:
+        journal.discard()
+
+
+def _apply_tag_changes(store, note_id, removed, added):
+    with store.transaction():
+        for tag in removed:
+            store.remove_tag_from_note(note_id, tag)
+        for tag in added:
+            store.add_tag_to_note(note_id, tag)
@@ -0,0 +1,376 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+GTK-free document model for rich-text note content.
+
+Content is stored in format v2, the note's plain text plus formatting as
+character ranges:
+
+{
+  "v": 2,
+  "text": "hello world\nitem",
+  "spans": [[6, 11, "bold"], [6, 11, "italic"]],
+  "blocks": [[1, 2, "bullet"]]
+}
+
+"spans" are [start, end, tag] character offsets into "text", sorted;
+"blocks" are [first line, end line, type] for lines that are not plain
+paragraphs. Both are omitted when empty. Supported tags: bold, italic,
+underline, strikethrough; block types: paragraph, bullet.
+
+Notes written before v2 use the legacy format, read transparently and
+upgraded the next time the note is saved:
+
+{
+  "blocks": [
+    {
+      "type": "paragraph" | "bullet",
+      "runs": [
+        {"text": "hello ", "tags": []},
+        {"text": "world", "tags": ["bold", "italic"]}
+      ]
+    }
+  ]
+}
+
+In memory a note is a Document of one Block per line, each made of Runs.
+parse_document() and serialize_document() convert between the stored
+content and Document; rich_text_serializer converts between Document and
+GtkTextBuffer. Everything here is safe to use without a display, e.g.
+from NoteStore.
+"""
+
+import json
+
+FORMAT_VERSION = 2
+
+PREVIEW_MAX_CHARS = 200
+
+# Raised by content that is not in either format
+_FORMAT_ERRORS = (ValueError, TypeError, KeyError, AttributeError)
+
+TAG_NAMES = frozenset({'bold', 'italic', 'underline', 'strikethrough'})
+
+
+class Run:
+    """A stretch of text within one line sharing the same tags."""
+
+    __slots__ = ('text', 'tags')
+
+    def __init__(self, text='', tags=None):
+        self.text = text
+        self.tags = tags if tags is not None else []
+
+    def __eq__(self, other):
+        if not isinstance(other, Run):
+            return NotImplemented
+        return self.text == other.text and self.tags == other.tags
+
+    def __repr__(self):
+        return f'Run({self.text!r}, {self.tags!r})'
+
+
+class Block:
+    """One line: a paragraph or a bullet item made of runs."""
+
+    __slots__ = ('type', 'runs')
+
+    def __init__(self, type='paragraph', runs=None):
+        self.type = type
+        self.runs = runs if runs is not None else []
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return NotImplemented
+        return self.type == other.type and self.runs == other.runs
+
+    def __repr__(self):
+        return f'Block({self.type!r}, {self.runs!r})'
+
+    @property
+    def text(self):
+        return ''.join(run.text for run in self.runs)
+
+
+class Document:
+    """A note's content as a list of blocks."""
+
+    __slots__ = ('blocks',)
+
+    def __init__(self, blocks=None):
+        self.blocks = blocks if blocks is not None else []
+
+    def __eq__(self, other):
+        if not isinstance(other, Document):
+            return NotImplemented
+        return self.blocks == other.blocks
+
+    def __repr__(self):
+        return f'Document({self.blocks!r})'
+
+    @classmethod
+    def from_plain_text(cls, text):
+        """One untagged paragraph per line of text."""
+        return cls([Block('paragraph', [Run(line)]) for line in text.split('\n')])
+
+
+def parse_document(json_str) -> Document:
+    """Parse note content in either format into a Document.
+
+    Anything that is not in a known format (plain text from older
+    versions, malformed JSON) is taken as plain text.
+    """
+    if not json_str:
+        return Document()
+    try:
+        return _document_from_data(json.loads(json_str))
+    except _FORMAT_ERRORS:
+        return Document.from_plain_text(json_str)
+
+
+def parse_spans(json_str):
+    """Parse note content in either format into (text, spans, blocks), as
+    format v2 stores them.
+
+    For v2 content this skips building a Document, so it is the cheaper
+    way in for consumers that work in character ranges, like a text
+    buffer.
+    """
+    if not json_str:
+        return '', [], []
+    try:
+        data = json.loads(json_str)
+        if data.get('v', 1) == FORMAT_VERSION:
+            return _v2_spans(data)
+        document = _document_from_data(data)
+    except _FORMAT_ERRORS:
+        document = Document.from_plain_text(json_str)
+    return document_spans(document)
+
+
+def _document_from_data(data):
+    version = data.get('v', 1)
+    if version == FORMAT_VERSION:
+        return _parse_v2(data)
+    if version == 1:
+        return _parse_legacy(data)
+    raise ValueError(f'unknown rich-text format version {version!r}')
+
+
+def _v2_spans(data):
+    text = data['text']
+    if not isinstance(text, str):
+        raise TypeError('text must be a string')
+    spans = data.get('spans', [])
+    blocks = data.get('blocks', [])
+    for entries in (spans, blocks):
+        for start, end, name in entries:
+            if not (isinstance(start, int) and isinstance(end, int)):
+                raise TypeError('range bounds must be integers')
+    return text, spans, blocks
+
+
+def _parse_legacy(data):
+    blocks = []
+    for block in data.get('blocks', []):
+        runs = []
+        for run in block.get('runs', []):
+            text = run.get('text', '')
+            if not isinstance(text, str):
+                raise TypeError('run text must be a string')
+            tags = run.get('tags')
+            runs.append(Run(text, tags if isinstance(tags, list) else None))
+        blocks.append(Block(block.get('type', 'paragraph'), runs))
+    return Document(blocks)
+
+
+def _parse_v2(data):
+    text, spans, blocks = _v2_spans(data)
+    line_types = {}
+    for first, end, block_type in blocks:
+        for line in range(first, end):
+            line_types[line] = block_type
+    if not text and not line_types:
+        return Document()
+
+    # Formatting in effect from each offset on, as [(offset, sorted tags)].
+    # Open tags are tracked as a bit mask, with a count per tag so that
+    # overlapping spans of one tag nest.
+    events = []
+    for start, end, tag in spans:
+        if start < end:
+            events.append((max(start, 0), 1, tag))
+            events.append((end, -1, tag))
+    events.sort()
+    bits = {}
+    counts = {}
+    tags_by_mask = {0: []}
+    mask = 0
+    states = [(0, [])]
+    for offset, delta, tag in events:
+        bit = bits.get(tag)
+        if bit is None:
+            bit = bits[tag] = 1 << len(bits)
+        count = counts[bit] = counts.get(bit, 0) + delta
+        mask = mask | bit if count > 0 else mask & ~bit
+        tags = tags_by_mask.get(mask)
+        if tags is None:
+            tags = tags_by_mask[mask] = sorted(t for t, b in bits.items() if mask & b)
+        if offset == states[-1][0]:
+            states[-1] = (offset, tags)
+        elif tags is not states[-1][1]:
+            states.append((offset, tags))
+
+    blocks = []
+    i = 0  # states[i] is in effect at line_start
+    line_start = 0
+    for line, line_text in enumerate(text.split('\n')):
+        line_end = line_start + len(line_text)
+        while i + 1 < len(states) and states[i + 1][0] <= line_start:
+            i += 1
+        blocks.append(Block(
+            line_types.get(line, 'paragraph'),
+            line_runs(text, states, i, line_start, line_end),
+        ))
+        line_start = line_end + 1  # past the newline
+    return Document(blocks)
+
+
+def line_runs(text, states, i, line_start, line_end):
+    """Cut the runs of one line out of text.
+
+    states is [(offset, formatting tags, ...)] in offset order, and
+    states[i] is in effect at line_start. A run spans consecutive states
+    with the same formatting tags; whatever else the states track does
+    not split it.
+    """
+    runs = []
+    pos = line_start
+    while pos < line_end:
+        tags = states[i][1]
+        i += 1
+        while (i < len(states) and states[i][0] < line_end
+               and states[i][1] == tags):
+            i += 1
+        run_end = line_end
+        if i < len(states) and states[i][0] < line_end:
+            run_end = states[i][0]
+        run_text = text[pos:run_end]
+        if run_text:
+            runs.append(Run(run_text, list(tags)))
+        pos = run_end
+
+    if not runs:
+        runs = [Run()]
+
+    return runs
+
+
+def document_spans(document):
+    """Return (text, spans, blocks) for a Document, as format v2 stores
+    them: spans of adjacent runs are merged, and so are the ranges of
+    adjacent lines of one block type."""
+    return join_block_spans(
+        (block.type, *block_spans(block)) for block in document.blocks
+    )
+
+
+def block_spans(block):
+    """Return (text, spans) for one line, as document_spans() gives them
+    but with offsets relative to the start of the line."""
+    parts = []
+    spans = []
+    last_span = {}  # tag -> its latest span, extended while runs are adjacent
+    offset = 0
+    for run in block.runs:
+        if not run.text:
+            continue
+        parts.append(run.text)
+        start, offset = offset, offset + len(run.text)
+        for tag in run.tags:
+            span = last_span.get(tag)
+            if span is not None and span[1] == start:
+                span[1] = offset
+            else:
+                span = last_span[tag] = [start, offset, tag]
+                spans.append(span)
+    spans.sort()
+    return ''.join(parts), spans
+
+
+def join_block_spans(lines):
+    """Return (text, spans, blocks) for lines given as (block type, text,
+    spans) with block_spans() offsets. The newline between two lines
+    keeps spans from ever touching across them, so the shifted spans of
+    each line just follow the previous line's."""
+    texts = []
+    spans = []
+    blocks = []
+    offset = 0
+    for line, (block_type, text, line_spans) in enumerate(lines):
+        if line:
+            offset += 1  # the newline
+        if block_type != 'paragraph':
+            if blocks and blocks[-1][1] == line and blocks[-1][2] == block_type:
+                blocks[-1][1] += 1
+            else:
+                blocks.append([line, line + 1, block_type])
+        spans.extend([start + offset, end + offset, tag]
+                     for start, end, tag in line_spans)
+        texts.append(text)
+        offset += len(text)
+    return '\n'.join(texts), spans, blocks
+
+
+def serialize_document(document) -> str:
+    """Serialize a Document to format v2."""
+    return serialize_spans(*document_spans(document))
+
+
+def serialize_spans(text, spans, blocks) -> str:
+    """Serialize the (text, spans, blocks) of document_spans() to format
+    v2."""
+    data = {'v': FORMAT_VERSION, 'text': text}
+    if spans:
+        data['spans'] = spans
+    if blocks:
+        data['blocks'] = blocks
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def document_plain_text(document) -> str:
+    return '\n'.join(
+        ''.join(run.text for run in block.runs) for block in document.blocks
+    )
+
+
+def get_plain_text(json_str) -> str:
+    """Extract plain text from note content (for search indexing).
+
+    Same result as document_plain_text(parse_document(json_str)), but
+    reads the decoded JSON directly instead of building a Document.
+    """
+    if not json_str:
+        return ''
+    try:
+        data = json.loads(json_str)
+        version = data.get('v', 1)
+        if version == FORMAT_VERSION:
+            return _v2_spans(data)[0]
+        if version != 1:
+            return json_str
+        lines = []
+        for block in data.get('blocks', []):
+            text = ''.join(run.get('text', '') for run in block.get('runs', []))
+            lines.append(text)
+        return '\n'.join(lines)
+    except _FORMAT_ERRORS:
+        return json_str
+
+
+def make_preview(plain_text) -> str:
+    """Cut plain text down to what a note card can show."""
+    return plain_text[:PREVIEW_MAX_CHARS]
+
+
+def document_preview(document) -> str:
+    return make_preview(document_plain_text(document))
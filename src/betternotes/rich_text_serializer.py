@@ -1,198 +1,281 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 """
-Rich text serialization between GtkTextBuffer and JSON.
-
-JSON format:
-{
-  "blocks": [
-    {
-      "type": "paragraph" | "bullet",
-      "runs": [
-        {"text": "hello ", "tags": []},
-        {"text": "world", "tags": ["bold", "italic"]}
-      ]
-    }
-  ]
-}
+Rich text conversion between GtkTextBuffer and the document model.
 
-Supported tags: bold, italic, underline, strikethrough, bullet
+The storage formats and the Document model are described in rich_text;
+this module only adapts them to GtkTextBuffer text and tags.
 """
 
-import json
-
 import gi
 gi.require_version('Gtk', '4.0')
 from gi.repository import Gtk
 
-
-TAG_NAMES = {'bold', 'italic', 'underline', 'strikethrough'}
+from betternotes.rich_text import (
+    TAG_NAMES,
+    Block,
+    Document,
+    block_spans,
+    document_spans,
+    join_block_spans,
+    line_runs,
+    parse_spans,
+    serialize_document,
+    serialize_spans,
+)
 
 
 def serialize_buffer(text_buffer) -> str:
     """Serialize a GtkTextBuffer to JSON string."""
-    blocks = []
-    start = text_buffer.get_start_iter()
-    end = text_buffer.get_end_iter()
+    return serialize_document(buffer_to_document(text_buffer))
 
-    if start.equal(end):
-        return json.dumps({'blocks': []})
 
-    full_text = text_buffer.get_text(start, end, True)
-    lines = full_text.split('\n')
+def buffer_to_document(text_buffer) -> Document:
+    """Build the Document shown by a GtkTextBuffer.
 
-    line_start = text_buffer.get_start_iter()
+    Reads the text once and walks the tag toggles once for the whole
+    buffer; runs are then sliced out of the text by character offset.
+    """
+    start = text_buffer.get_start_iter()
+    end = text_buffer.get_end_iter()
 
-    for line_idx, line_text in enumerate(lines):
-        line_end = line_start.copy()
-        line_end.forward_chars(len(line_text))
+    if start.equal(end):
+        return Document()
 
-        runs = _extract_runs(text_buffer, line_start, line_end)
+    return Document(_serialize_lines(text_buffer, start, end))
 
-        # Determine block type
-        block_type = 'paragraph'
-        bullet_tag = text_buffer.get_tag_table().lookup('bullet')
-        if bullet_tag and line_start.has_tag(bullet_tag):
-            block_type = 'bullet'
 
-        blocks.append({'type': block_type, 'runs': runs})
+def _serialize_lines(text_buffer, start, end):
+    """Return the blocks of the lines from start (a line start) to end
+    (a line end)."""
+    full_text = text_buffer.get_text(start, end, True)
+    states = _formatting_states(start, end)
 
-        # Move past the newline
-        if line_idx < len(lines) - 1:
-            line_start = line_end.copy()
-            line_start.forward_char()
-        else:
-            line_start = line_end
+    blocks = []
+    i = 0  # states[i] is in effect at line_start
+    line_start = 0
+    for line_text in full_text.split('\n'):
+        line_end = line_start + len(line_text)
+        while i + 1 < len(states) and states[i + 1][0] <= line_start:
+            i += 1
+
+        block_type = 'bullet' if states[i][2] else 'paragraph'
+        blocks.append(Block(
+            block_type, line_runs(full_text, states, i, line_start, line_end),
+        ))
+        line_start = line_end + 1  # past the newline
+
+    return blocks
+
+
+class IncrementalSerializer:
+    """Serializes one GtkTextBuffer, redoing only the lines edited since
+    the previous call.
+
+    The buffer's insert, delete and tag signals keep a per-line cache of
+    Blocks in step with the text: edited lines are dropped from it, and
+    lines added or joined by an edit are inserted or removed. The text
+    and spans of each line are kept with its Block, so a save only
+    re-encodes the edited lines and then shifts and joins the rest. The
+    output is identical to serialize_buffer(), and is reused as is while
+    the buffer does not change.
+    """
+
+    # Besides \n, GtkTextBuffer also breaks lines at these; the cache's
+    # line numbers would then disagree with the format's blocks.
+    _OTHER_LINE_BREAKS = ('\r', '\u2029')
+
+    def __init__(self, text_buffer):
+        self._buffer = text_buffer
+        self._blocks = None  # Block per line, None where dirty
+        self._output = None  # last serialize() result, None once edited
+        # id(Block) -> (Block, text, spans) of the last serialize()
+        self._line_spans = {}
+        text_buffer.connect('insert-text', self._on_insert_text)
+        text_buffer.connect('insert-paintable', self._on_insert_object)
+        text_buffer.connect('insert-child-anchor', self._on_insert_object)
+        text_buffer.connect('delete-range', self._on_delete_range)
+        text_buffer.connect('apply-tag', self._on_tag_changed)
+        text_buffer.connect('remove-tag', self._on_tag_changed)
+
+    def serialize(self) -> str:
+        if self._output is None:
+            self._output = self._serialize(self.document())
+        return self._output
+
+    def _serialize(self, document):
+        cached = self._line_spans
+        self._line_spans = {}
+        lines = []
+        for block in document.blocks:
+            entry = cached.get(id(block))
+            if entry is None or entry[0] is not block:
+                entry = (block, *block_spans(block))
+            self._line_spans[id(block)] = entry
+            lines.append((block.type, entry[1], entry[2]))
+        return serialize_spans(*join_block_spans(lines))
+
+    def document(self) -> Document:
+        """Build the buffer's Document. Lines not edited since the
+        previous call keep their Block objects."""
+        text_buffer = self._buffer
+        if self._blocks is None:
+            text = text_buffer.get_text(
+                text_buffer.get_start_iter(), text_buffer.get_end_iter(), True,
+            )
+            if any(c in text for c in self._OTHER_LINE_BREAKS):
+                return buffer_to_document(text_buffer)
+            self._blocks = [None] * text_buffer.get_line_count()
+
+        if text_buffer.get_char_count() == 0:
+            return Document()
+
+        blocks = self._blocks
+        line = 0
+        while line < len(blocks):
+            if blocks[line] is not None:
+                line += 1
+                continue
+            last = line
+            while last + 1 < len(blocks) and blocks[last + 1] is None:
+                last += 1
+            _, start = text_buffer.get_iter_at_line(line)
+            _, end = text_buffer.get_iter_at_line(last)
+            if not end.ends_line():
+                end.forward_to_line_end()
+            blocks[line:last + 1] = _serialize_lines(text_buffer, start, end)
+            line = last + 1
+
+        return Document(list(blocks))
+
+    def invalidate(self):
+        """Forget the cache; the next serialize() starts from scratch."""
+        self._blocks = None
+        self._output = None
+        self._line_spans = {}
+
+    def _on_insert_text(self, text_buffer, location, text, length):
+        self._output = None
+        if self._blocks is None:
+            return
+        if any(c in text for c in self._OTHER_LINE_BREAKS):
+            self._blocks = None
+            return
+        line = location.get_line()
+        self._blocks[line:line + 1] = [None] * (text.count('\n') + 1)
+
+    def _on_insert_object(self, text_buffer, location, obj):
+        self._output = None
+        if self._blocks is not None:
+            self._blocks[location.get_line()] = None
+
+    def _on_delete_range(self, text_buffer, start, end):
+        self._output = None
+        if self._blocks is not None:
+            self._blocks[start.get_line():end.get_line() + 1] = [None]
+
+    def _on_tag_changed(self, text_buffer, tag, start, end):
+        self._output = None
+        if self._blocks is not None:
+            first, last = start.get_line(), end.get_line()
+            self._blocks[first:last + 1] = [None] * (last - first + 1)
+
+
+def _formatting_states(start, end):
+    """Return [(offset, sorted formatting tag names, is_bullet)] for start
+    and every later point before end where either changes, in one forward
+    pass over the tag toggles. Offsets are relative to start."""
+    names = {}
+
+    def state_at(it):
+        formatting = []
+        bullet = False
+        for tag in it.get_tags():
+            name = names.get(tag)
+            if name is None:
+                name = names[tag] = tag.get_property('name') or ''
+            if name in TAG_NAMES:
+                formatting.append(name)
+            elif name == 'bullet':
+                bullet = True
+        return tuple(sorted(formatting)), bullet
+
+    base = start.get_offset()
+    limit = end.get_offset()
+    it = start.copy()
+    states = [(0, *state_at(it))]
+    while it.forward_to_tag_toggle(None) and it.get_offset() <= limit:
+        state = state_at(it)
+        if state != states[-1][1:]:
+            states.append((it.get_offset() - base, *state))
+    return states
 
-    return json.dumps({'blocks': blocks})
 
+def deserialize_to_buffer(text_buffer, json_str):
+    """Deserialize note content in either format into a GtkTextBuffer,
+    applying formatting tags."""
+    _load_spans(text_buffer, *parse_spans(json_str))
 
-def _extract_runs(text_buffer, start, end):
-    """Extract formatted text runs from a range in the buffer."""
-    runs = []
-    if start.equal(end):
-        return [{'text': '', 'tags': []}]
 
-    it = start.copy()
-    while it.compare(end) < 0:
-        # Get active tags at this position
-        active_tags = _get_tag_names(it)
-
-        # Find how far this tag combination extends
-        run_end = it.copy()
-        while run_end.compare(end) < 0:
-            if not run_end.forward_to_tag_toggle(None):
-                run_end = end.copy()
-                break
-            if run_end.compare(end) >= 0:
-                run_end = end.copy()
-                break
-            # Check if tags actually changed
-            if _get_tag_names(run_end) != active_tags:
-                break
-
-        text = text_buffer.get_text(it, run_end, True)
-        if text:
-            runs.append({'text': text, 'tags': sorted(active_tags)})
-
-        it = run_end.copy()
-
-    if not runs:
-        runs = [{'text': '', 'tags': []}]
-
-    return runs
-
-
-def _get_tag_names(text_iter):
-    """Get recognized formatting tag names at a text iterator position."""
-    tags = text_iter.get_tags()
-    names = set()
-    for tag in tags:
-        name = tag.get_property('name')
-        if name in TAG_NAMES:
-            names.add(name)
-    return names
+def load_document(text_buffer, document):
+    """Replace a GtkTextBuffer's contents with a Document."""
+    _load_spans(text_buffer, *document_spans(document))
 
 
-def deserialize_to_buffer(text_buffer, json_str):
-    """Deserialize JSON string into a GtkTextBuffer, applying formatting tags."""
-    text_buffer.set_text('')
+def _load_spans(text_buffer, text, spans, blocks):
+    """Insert the whole text at once, then apply each tag once per span.
 
-    if not json_str:
+    Spans come merged from format v2 or document_spans(), so adjacent
+    runs sharing a tag cost one apply_tag().
+    """
+    text_buffer.set_text(text)
+    if not (text or spans or blocks):
         return
 
-    try:
-        data = json.loads(json_str)
-    except (json.JSONDecodeError, TypeError):
-        # Treat as plain text fallback
-        text_buffer.set_text(json_str)
-        return
+    _ensure_tags(text_buffer)
+    table = text_buffer.get_tag_table()
+    length = len(text)
+    for start, end, tag_name in spans:
+        start, end = max(start, 0), min(end, length)
+        if tag_name in TAG_NAMES and start < end:
+            text_buffer.apply_tag(
+                table.lookup(tag_name),
+                text_buffer.get_iter_at_offset(start),
+                text_buffer.get_iter_at_offset(end),
+            )
 
-    blocks = data.get('blocks', [])
     if not blocks:
         return
-
-    _ensure_tags(text_buffer)
-
-    for block_idx, block in enumerate(blocks):
-        if block_idx > 0:
-            text_buffer.insert(text_buffer.get_end_iter(), '\n')
-
-        block_start_offset = text_buffer.get_end_iter().get_offset()
-        block_type = block.get('type', 'paragraph')
-
-        for run in block.get('runs', []):
-            text = run.get('text', '')
-            if not text:
-                continue
-
-            start_offset = text_buffer.get_end_iter().get_offset()
-            text_buffer.insert(text_buffer.get_end_iter(), text)
-
-            # Apply formatting tags
-            run_start = text_buffer.get_iter_at_offset(start_offset)
-            run_end = text_buffer.get_end_iter()
-            for tag_name in run.get('tags', []):
-                if tag_name in TAG_NAMES:
-                    tag = text_buffer.get_tag_table().lookup(tag_name)
-                    if tag:
-                        text_buffer.apply_tag(tag, run_start, run_end)
-
-        # Apply bullet tag to entire line
-        if block_type == 'bullet':
-            line_start = text_buffer.get_iter_at_offset(block_start_offset)
-            line_end = text_buffer.get_end_iter()
-            bullet_tag = text_buffer.get_tag_table().lookup('bullet')
-            if bullet_tag:
-                text_buffer.apply_tag(bullet_tag, line_start, line_end)
+    line_bounds = []
+    offset = 0
+    for line_text in text.split('\n'):
+        line_bounds.append((offset, offset + len(line_text)))
+        offset += len(line_text) + 1
+    bullet_tag = table.lookup('bullet')
+    for first, end, block_type in blocks:
+        if block_type != 'bullet':
+            continue
+        for line_start, line_end in line_bounds[max(first, 0):max(end, 0)]:
+            # Bullet covers the line, not its newline
+            if line_end > line_start:
+                text_buffer.apply_tag(
+                    bullet_tag,
+                    text_buffer.get_iter_at_offset(line_start),
+                    text_buffer.get_iter_at_offset(line_end),
+                )
+
+
+_TAG_PROPS = {
+    'bold': {'weight': 700},
+    'italic': {'style': 2},  # Pango.Style.ITALIC
+    'underline': {'underline': 1},  # Pango.Underline.SINGLE
+    'strikethrough': {'strikethrough': True},
+    'bullet': {},
+}
 
 
 def _ensure_tags(text_buffer):
     """Ensure all formatting tags exist in the buffer's tag table."""
     table = text_buffer.get_tag_table()
-
-    tag_props = {
-        'bold': {'weight': 700},
-        'italic': {'style': 2},  # Pango.Style.ITALIC
-        'underline': {'underline': 1},  # Pango.Underline.SINGLE
-        'strikethrough': {'strikethrough': True},
-        'bullet': {},
-    }
-
-    for name, props in tag_props.items():
+    for name, props in _TAG_PROPS.items():
         if table.lookup(name) is None:
-            tag = text_buffer.create_tag(name, **props)
-
-
-def get_plain_text(json_str) -> str:
-    """Extract plain text from rich-text JSON (for search indexing)."""
-    if not json_str:
-        return ''
-    try:
-        data = json.loads(json_str)
-        lines = []
-        for block in data.get('blocks', []):
-            text = ''.join(run.get('text', '') for run in block.get('runs', []))
-            lines.append(text)
-        return '\n'.join(lines)
-    except (json.JSONDecodeError, TypeError):
-        return json_str
+            text_buffer.create_tag(name, **props)
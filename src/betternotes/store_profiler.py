@@ -0,0 +1,187 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Opt-in instrumentation for NoteStore.
+
+Set BETTERNOTES_PROFILE=/path/to/profile.json to record, per public store
+method, call counts, returned row counts, SQL statements issued and a
+latency histogram, and per overview view, how many refreshes ran and
+how long each took from request to applied result. The profile is
+written on quit, or on demand with the app.dump-profile action
+(Ctrl+Shift+Alt+P). When the variable is unset nothing is wrapped, so
+there is no overhead.
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+
+from betternotes.note import NotePage
+
+PROFILE_ENV = 'BETTERNOTES_PROFILE'
+
+# Log-spaced latency buckets: 10 µs doubling every 4 buckets, up to ~40 s.
+_BUCKET_BASE_S = 10e-6
+_BUCKETS_PER_DOUBLING = 4
+_BUCKET_COUNT = 88
+
+_UNWRAPPED = frozenset({
+    'close', 'transaction', 'set_trace_callback', 'subscribe',
+})
+
+
+class _Histogram:
+    """Fixed-size log-bucketed latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.total = 0
+        self.sum_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, seconds):
+        if seconds <= _BUCKET_BASE_S:
+            index = 0
+        else:
+            index = int(math.log2(seconds / _BUCKET_BASE_S) * _BUCKETS_PER_DOUBLING) + 1
+        self.counts[min(index, _BUCKET_COUNT - 1)] += 1
+        self.total += 1
+        self.sum_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile."""
+        rank = math.ceil(pct / 100 * self.total)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max_s)
+        return self.max_s
+
+    @staticmethod
+    def _upper_bound(index):
+        return _BUCKET_BASE_S * 2 ** (index / _BUCKETS_PER_DOUBLING)
+
+    def as_dict(self):
+        ms = lambda s: round(s * 1000, 3)
+        return {
+            'mean_ms': ms(self.sum_s / self.total) if self.total else 0,
+            'p50_ms': ms(self.percentile(50)),
+            'p95_ms': ms(self.percentile(95)),
+            'p99_ms': ms(self.percentile(99)),
+            'max_ms': ms(self.max_s),
+        }
+
+
+class _MethodStats:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.statements = 0
+        self.latency = _Histogram()
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'statements': self.statements,
+            **self.latency.as_dict(),
+        }
+
+
+class StoreProfiler:
+    """Collects per-method statistics for one NoteStore instance."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._statements = {}
+        self._refreshes = {}
+        self._local = threading.local()
+
+    def instrument(self, store):
+        """Wrap the store's public methods and trace its SQL."""
+        for name in dir(type(store)):
+            if name.startswith('_') or name in _UNWRAPPED:
+                continue
+            method = getattr(store, name)
+            if callable(method):
+                setattr(store, name, self._wrap(name, method))
+        store.set_trace_callback(self._on_statement)
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            outer = getattr(self._local, 'statements', None)
+            self._local.statements = 0
+            start = time.perf_counter()
+            failed = False
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                statements = self._local.statements
+                self._local.statements = outer
+                if outer is not None:
+                    self._local.statements += statements
+                with self._lock:
+                    stats = self._stats.setdefault(name, _MethodStats())
+                    stats.calls += 1
+                    stats.errors += failed
+                    stats.statements += statements
+                    stats.latency.add(elapsed)
+                    if not failed:
+                        stats.rows += _row_count(result)
+            return result
+        return wrapper
+
+    def _on_statement(self, sql):
+        sql = sql.lstrip()
+        if sql.startswith('--'):
+            # Statements run by triggers and FTS5 internals
+            verb = 'NESTED'
+        else:
+            verb = sql.split(None, 1)[0].upper() if sql else ''
+            if getattr(self._local, 'statements', None) is not None:
+                self._local.statements += 1
+        with self._lock:
+            self._statements[verb] = self._statements.get(verb, 0) + 1
+
+    def add_refresh(self, view, seconds):
+        """Record one refresh of an overview view taking seconds."""
+        with self._lock:
+            self._refreshes.setdefault(view, _Histogram()).add(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'methods': {
+                    name: stats.as_dict()
+                    for name, stats in sorted(self._stats.items())
+                },
+                'statements': dict(sorted(self._statements.items())),
+                'refreshes': {
+                    view: {'count': latency.total, **latency.as_dict()}
+                    for view, latency in sorted(self._refreshes.items())
+                },
+            }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+def _row_count(result):
+    if isinstance(result, NotePage):
+        return len(result.notes)
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return 0 if result is None or isinstance(result, bool) else 1
@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Crash recovery from edit journals.
+
+Each test journals edits to a note the way its window does, stops where
+a crash would, and checks what recover_journals() makes of the journal.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from betternotes.edit_journal import EditJournal, recover_journals  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+from betternotes.rich_text import Document, serialize_document  # noqa: E402
+
+
+def content(text):
+    return serialize_document(Document.from_plain_text(text))
+
+
+class RecoverJournalsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.journals = os.path.join(self._dir.name, 'journal')
+        self.store = NoteStore(os.path.join(self._dir.name, 'notes.db'))
+        self.note = self.store.create_note(title='list', content=content('milk'))
+        self.path = os.path.join(self.journals, self.note.id + '.jsonl')
+        self.journal = EditJournal(self.note.id, self.note.title,
+                                   self.note.content, directory=self.journals)
+
+    def tearDown(self):
+        self.store.close()
+        self._dir.cleanup()
+
+    def record(self, title, text):
+        self.journal.record(title, Document.from_plain_text(text))
+
+    def recover(self):
+        return recover_journals(self.store, directory=self.journals)
+
+    def assertNote(self, title, text):
+        note = self.store.get_note(self.note.id)
+        self.assertEqual((note.title, note.content), (title, content(text)))
+
+    def test_no_journals(self):
+        self.assertEqual(self.recover(), [])
+
+    def test_crash_before_any_save(self):
+        self.record('list', 'milk\neggs')
+        self.record('groceries', 'milk\neggs\nbread')
+        self.assertEqual(self.recover(), [self.note.id])
+        self.assertNote('groceries', 'milk\neggs\nbread')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_save_never_committed(self):
+        # The save was handed to the store, but the crash came first: the
+        # database still matches the journal's first checkpoint.
+        self.record('list', 'milk\neggs')
+        self.journal.checkpoint('list', content('milk\neggs'))
+        self.record('list', 'milk\neggs\nbread')
+        self.assertEqual(self.recover(), [self.note.id])
+        self.assertNote('list', 'milk\neggs\nbread')
+
+    def test_save_committed(self):
+        self.record('list', 'milk\neggs')
+        self.journal.checkpoint('list', content('milk\neggs'))
+        self.store.update_note(self.note.id, content=content('milk\neggs'))
+        self.record('list', 'eggs')
+        self.assertEqual(self.recover(), [self.note.id])
+        self.assertNote('list', 'eggs')
+
+    def test_nothing_after_last_save(self):
+        self.record('list', 'milk\neggs')
+        self.journal.checkpoint('list', content('milk\neggs'))
+        self.store.update_note(self.note.id, content=content('milk\neggs'))
+        self.assertEqual(self.recover(), [])
+        self.assertNote('list', 'milk\neggs')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_no_matching_checkpoint(self):
+        self.record('list', 'milk\neggs')
+        self.store.update_note(self.note.id, content=content('changed elsewhere'))
+        self.assertEqual(self.recover(), [])
+        self.assertNote('list', 'changed elsewhere')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_torn_last_line(self):
+        self.record('list', 'milk\neggs')
+        with open(self.path, 'ab') as f:
+            f.write(b'{"line":2,"remove":0,"blo')
+        self.assertEqual(self.recover(), [self.note.id])
+        self.assertNote('list', 'milk\neggs')
+
+    def test_deleted_note(self):
+        self.record('list', 'milk\neggs')
+        self.store.delete_note(self.note.id)
+        self.assertEqual(self.recover(), [])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_malformed_record_is_kept(self):
+        other = self.store.create_note(title='other', content=content('a'))
+        other_journal = EditJournal(other.id, other.title, other.content,
+                                    directory=self.journals)
+        other_journal.record('other', Document.from_plain_text('a\nb'))
+        self.record('list', 'milk\neggs')
+        with open(self.path, 'ab') as f:
+            f.write(b'{"line":0,"blocks":[]}\n')  # no "remove"
+
+        with self.assertLogs('betternotes.edit_journal', 'ERROR'):
+            self.assertEqual(self.recover(), [other.id])
+        self.assertNote('list', 'milk')
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(self.store.get_note(other.id).content, content('a\nb'))
+
+
+if __name__ == '__main__':
+    unittest.main()
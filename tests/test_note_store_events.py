@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Batching of the ChangeEvents NoteStore publishes.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from betternotes.note import ChangeEvent  # noqa: E402
+from betternotes.note_store import NoteStore  # noqa: E402
+
+
+class ChangeEventTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = NoteStore(os.path.join(self._dir.name, 'notes.db'))
+        self.a = self.store.create_note(title='a').id
+        self.b = self.store.create_note(title='b').id
+        self.batches = []
+        self.store.subscribe(self.batches.append)
+
+    def tearDown(self):
+        self.store.close()
+        self._dir.cleanup()
+
+    def kinds(self):
+        return [[(e.kind, e.note_ids) for e in batch] for batch in self.batches]
+
+    def test_one_batch_per_write(self):
+        self.store.trash_note(self.a)
+        self.store.restore_note(self.a)
+        self.assertEqual(self.kinds(), [
+            [('trashed', {self.a})],
+            [('restored', {self.a})],
+        ])
+
+    def test_transaction_folds_runs_of_a_kind(self):
+        with self.store.transaction():
+            self.store.add_tag_to_note(self.a, 'x')
+            self.store.add_tag_to_note(self.b, 'y')
+            self.store.trash_note(self.a)
+        self.assertEqual(self.batches, [[
+            ChangeEvent('tagged', frozenset({self.a, self.b}), frozenset({'tags'})),
+            ChangeEvent('trashed', frozenset({self.a})),
+        ]])
+
+    def test_rollback_drops_events(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.transaction():
+                self.store.trash_note(self.a)
+                raise RuntimeError
+        self.assertEqual(self.batches, [])
+        self.assertIsNone(self.store.get_note(self.a).trashed_at)
+
+    def test_nested_rollback_keeps_outer_events(self):
+        with self.store.transaction():
+            self.store.add_tag_to_note(self.a, 'x')
+            with self.assertRaises(RuntimeError):
+                with self.store.transaction():
+                    self.store.add_tag_to_note(self.b, 'x')
+                    raise RuntimeError
+        self.assertEqual(self.kinds(), [[('tagged', {self.a})]])
+        self.assertEqual(self.store.get_tags_for_note(self.b), [])
+
+    def test_nested_commit_folds_into_outer(self):
+        with self.store.transaction():
+            self.store.add_tag_to_note(self.a, 'x')
+            with self.store.transaction():
+                self.store.add_tag_to_note(self.b, 'x')
+        self.assertEqual(self.kinds(), [[('tagged', {self.a, self.b})]])
+
+    def test_missing_notes_publish_nothing(self):
+        self.store.trash_note('missing')
+        self.store.restore_note('missing')
+        self.store.delete_note('missing')
+        self.store.trash_notes(['missing'])
+        self.assertEqual(self.batches, [])
+
+        self.store.trash_notes([self.a, 'missing'])
+        self.store.restore_notes([self.a, 'missing'])
+        self.store.delete_notes([self.b, 'missing'])
+        self.assertEqual(self.kinds(), [
+            [('trashed', {self.a})],
+            [('restored', {self.a})],
+            [('deleted', {self.b})],
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Query plans of the store's hot queries.
+
+Runs each NoteStore call with the trace hook installed, then asks SQLite
+for the plan of the statements it issued, so the checks follow the
+queries as the store actually writes them.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from betternotes.note_store import NoteStore  # noqa: E402
+
+# A full table scan; scans of an index are reported as "SCAN t USING ..."
+_FULL_SCAN = re.compile(r'^SCAN \w+$')
+
+
+class QueryPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'notes.db')
+        # No read pool: every statement is traced on the one connection
+        self.store = NoteStore(self.path, read_pool_size=0)
+        for i in range(2):
+            note = self.store.create_note(title=f'tagged {i}')
+            self.store.add_tag_to_note(note.id, 'work')
+            self.store.trash_note(self.store.create_note(title=f'trashed {i}').id)
+        self.db = sqlite3.connect(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.store.close()
+        self._dir.cleanup()
+
+    def plans(self, call):
+        """Return [(sql, plan details)] for the statements call() issues."""
+        statements = []
+        self.store.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            self.store.set_trace_callback(None)
+        return [
+            (sql, [row[3] for row in self.db.execute(f'EXPLAIN QUERY PLAN {sql}')])
+            for sql in statements
+            if sql.split(None, 1)[0].upper() in ('SELECT', 'DELETE', 'UPDATE')
+        ]
+
+    def assertIndexed(self, call, index, sorted_by_index=True):
+        """The first statement of call() uses index and scans no table;
+        with sorted_by_index, it also needs no temporary sort."""
+        sql, plan = self.plans(call)[0]
+        message = f'{sql}\n' + '\n'.join(plan)
+        self.assertTrue(any(index in detail for detail in plan), message)
+        self.assertFalse(any(_FULL_SCAN.match(detail) for detail in plan), message)
+        if sorted_by_index:
+            self.assertFalse(any('TEMP B-TREE' in detail for detail in plan), message)
+
+    def test_list(self):
+        self.assertIndexed(self.store.get_notes_page, 'idx_notes_list')
+        page = self.store.get_notes_page(limit=1)
+        self.assertIndexed(
+            lambda: self.store.get_notes_page(page.next_cursor), 'idx_notes_list',
+        )
+
+    def test_trash(self):
+        self.assertIndexed(self.store.get_trashed_notes_page, 'idx_notes_trash')
+        page = self.store.get_trashed_notes_page(limit=1)
+        self.assertIndexed(
+            lambda: self.store.get_trashed_notes_page(page.next_cursor),
+            'idx_notes_trash',
+        )
+
+    def test_purge(self):
+        self.assertIndexed(self.store._purge_old_trash, 'idx_notes_trash')
+        self.assertIndexed(self.store.empty_trash, 'idx_notes_trash')
+
+    def test_tags(self):
+        # A tag's notes are found through the index, then sorted: the sort
+        # is bounded by the tag's size rather than the whole table.
+        self.assertIndexed(
+            lambda: self.store.get_notes_page(tag_name='work'),
+            'idx_note_tags_tag', sorted_by_index=False,
+        )
+        self.assertIndexed(
+            lambda: self.store.get_notes_by_tag('work'),
+            'idx_note_tags_tag', sorted_by_index=False,
+        )
+        self.assertIndexed(
+            self.store.get_all_tags, 'idx_note_tags_tag', sorted_by_index=False,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Round trips of the rich-text document model through both formats.
+
+Every note body in a fuzz corpus covering each tag combination is written
+in the legacy format, read, upgraded to format v2 and read again; both
+formats must give back the same document, plain text, spans and preview.
+Needs no display.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(_ROOT, 'src'))
+sys.path.insert(0, os.path.join(_ROOT, 'benchmarks'))
+
+from corpus import Corpus  # noqa: E402
+from betternotes.rich_text import (  # noqa: E402
+    Block,
+    Document,
+    Run,
+    document_plain_text,
+    document_preview,
+    get_plain_text,
+    make_preview,
+    parse_document,
+    parse_spans,
+    serialize_document,
+)
+
+FUZZ_DOCUMENTS = 2000
+
+
+def reference_document(json_str):
+    """The Document of legacy content, read straight from its JSON."""
+    return Document([
+        Block(block['type'], [Run(run['text'], run['tags']) for run in block['runs']])
+        for block in json.loads(json_str)['blocks']
+    ])
+
+
+class RoundTripTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        corpus = Corpus(0)
+        cls.legacy = [corpus.tag_combinations_rich_text()]
+        cls.legacy += [corpus.fuzz_rich_text() for _ in range(FUZZ_DOCUMENTS)]
+
+    def assertEachEqual(self, check):
+        """Assert check(legacy content) gives equal pairs for every fuzz
+        document, reporting the first that does not."""
+        for content in self.legacy:
+            first, second = check(content)
+            self.assertEqual(first, second, content)
+
+    def test_legacy_parse(self):
+        self.assertEachEqual(
+            lambda c: (parse_document(c), reference_document(c)))
+
+    def test_v2_round_trip(self):
+        self.assertEachEqual(
+            lambda c: (parse_document(serialize_document(parse_document(c))),
+                       parse_document(c)))
+
+    def test_v2_serialize_stable(self):
+        def check(content):
+            v2 = serialize_document(parse_document(content))
+            return serialize_document(parse_document(v2)), v2
+        self.assertEachEqual(check)
+
+    def test_plain_text(self):
+        def check(content):
+            v2 = serialize_document(parse_document(content))
+            text = document_plain_text(reference_document(content))
+            return ((get_plain_text(content), get_plain_text(v2),
+                     document_plain_text(parse_document(v2))),
+                    (text, text, text))
+        self.assertEachEqual(check)
+
+    def test_spans(self):
+        def check(content):
+            v2 = serialize_document(parse_document(content))
+            return (parse_spans(content), parse_spans(v2))
+        self.assertEachEqual(check)
+
+    def test_preview(self):
+        def check(content):
+            v2 = serialize_document(parse_document(content))
+            return (make_preview(get_plain_text(content)),
+                    document_preview(parse_document(v2)))
+        self.assertEachEqual(check)
+
+
+class FallbackTest(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(parse_document(''), Document())
+        self.assertEqual(parse_spans(''), ('', [], []))
+        self.assertEqual(get_plain_text(''), '')
+
+    def test_plain_text_content(self):
+        for content in ('just text\nsecond line', '{"blocks": 3', '[1, 2]'):
+            self.assertEqual(parse_document(content),
+                             Document.from_plain_text(content), content)
+            self.assertEqual(get_plain_text(content), content, content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""
+Round trips of note content through a GtkTextBuffer.
+
+Every note body in a fuzz corpus covering each tag combination must load
+into a buffer, from the legacy format and from format v2, and serialize
+back as its v2 form, and the incremental serializer must agree with a
+full serialization after edits. Needs GTK 4, but no display.
+"""
+
+import os
+import random
+import sys
+import unittest
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(_ROOT, 'src'))
+sys.path.insert(0, os.path.join(_ROOT, 'benchmarks'))
+
+from corpus import Corpus  # noqa: E402
+from betternotes.rich_text import (  # noqa: E402
+    TAG_NAMES,
+    get_plain_text,
+    parse_document,
+    serialize_document,
+)
+
+try:
+    import gi
+    gi.require_version('Gtk', '4.0')
+    from gi.repository import Gtk
+except (ImportError, ValueError):
+    Gtk = None
+else:
+    from betternotes.rich_text_serializer import (
+        IncrementalSerializer,
+        deserialize_to_buffer,
+        serialize_buffer,
+    )
+
+FUZZ_DOCUMENTS = 1000
+
+
+@unittest.skipIf(Gtk is None, 'needs GTK 4')
+class BufferRoundTripTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        corpus = Corpus(0)
+        cls.legacy = [corpus.tag_combinations_rich_text()]
+        cls.legacy += [corpus.fuzz_rich_text() for _ in range(FUZZ_DOCUMENTS)]
+
+    def test_fuzz(self):
+        for content in self.legacy:
+            expected = serialize_document(parse_document(content))
+            for stored in (content, expected):
+                text_buffer = Gtk.TextBuffer()
+                deserialize_to_buffer(text_buffer, stored)
+                text = text_buffer.get_text(
+                    text_buffer.get_start_iter(), text_buffer.get_end_iter(), True)
+                self.assertEqual(text, get_plain_text(content), stored)
+                self.assertEqual(serialize_buffer(text_buffer), expected, stored)
+
+    def test_incremental(self):
+        rnd = random.Random(0)
+        tags = sorted(TAG_NAMES)
+        for content in self.legacy[:200]:
+            text_buffer = Gtk.TextBuffer()
+            deserialize_to_buffer(text_buffer, content)
+            serializer = IncrementalSerializer(text_buffer)
+            serializer.serialize()
+            for _ in range(5):
+                length = text_buffer.get_char_count()
+                start = rnd.randint(0, length)
+                end = rnd.randint(start, length)
+                edit = rnd.choice(('insert', 'newline', 'delete', 'tag'))
+                if edit == 'insert':
+                    text_buffer.insert(text_buffer.get_iter_at_offset(start), 'xy')
+                elif edit == 'newline':
+                    text_buffer.insert(text_buffer.get_iter_at_offset(start), '\n')
+                elif edit == 'delete':
+                    text_buffer.delete(text_buffer.get_iter_at_offset(start),
+                                       text_buffer.get_iter_at_offset(end))
+                else:
+                    text_buffer.apply_tag_by_name(
+                        rnd.choice(tags), text_buffer.get_iter_at_offset(start),
+                        text_buffer.get_iter_at_offset(end))
+                self.assertEqual(serializer.serialize(),
+                                 serialize_buffer(text_buffer), content)
+
+
+if __name__ == '__main__':
+    unittest.main()